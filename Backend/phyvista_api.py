@@ -3,32 +3,64 @@ PhyVista Flask API Server
 REST API for interfacing with the physics simulation backend
 Optimized version with bug fixes and performance improvements
 """
+import hashlib
+import io
+import math
 import os
 import json
 import logging
-import uuid
+import secrets
 import numpy as np
-from flask import Flask, request, jsonify
+import orjson
+from enum import Enum
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
+from flask_compress import Compress
 from flask_socketio import SocketIO, emit
 import redis
 import pickle
-from typing import Dict, Optional, List, Any
+from typing import Dict, Optional, List, Any, Tuple, Iterable, Iterator
 from functools import wraps
+from dataclasses import dataclass, fields
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from collections import OrderedDict
+import atexit
+import multiprocessing
+import threading
+import time
+import weakref
 
 # Import from the physics engine (assumes phyvista_backend.py is in same directory)
 from phyvista_backend import (
     Simulation, PhysicsParameters, PIDController, 
-    GravityEnvironment, VehicleState
+    GravityEnvironment, VehicleState, run_sweep_value, warm_up_kernels
 )
 
+# Compile the physics kernels (or load them from numba's on-disk cache) at import rather than
+# in the first request; workers forked after import (gunicorn --preload, sweep pool) inherit them
+warm_up_kernels()
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "*"}})
-socketio = SocketIO(app, cors_allowed_origins="*")
+
+# Compress large JSON/NDJSON/NPY payloads; streamed responses are compressed chunk by chunk
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_LEVEL'] = 4
+app.config['COMPRESS_BR_LEVEL'] = 4
+app.config['COMPRESS_MIN_SIZE'] = 1024
+app.config['COMPRESS_MIMETYPES'] = [
+    'application/json', 'application/x-ndjson', 'application/octet-stream'
+]
+Compress(app)
+# SOCKETIO_ASYNC_MODE selects the concurrency model ('threading', 'eventlet' or
+# 'gevent'); unset lets Flask-SocketIO pick the best one installed.
+socketio = SocketIO(app, cors_allowed_origins="*",
+                    async_mode=os.environ.get('SOCKETIO_ASYNC_MODE') or None)
 
 # API v1 Blueprint
 from flask import Blueprint
@@ -40,90 +72,391 @@ if not REDIS_URL:
     raise RuntimeError("REDIS_URL environment variable not set")
 redis_client = redis.from_url(REDIS_URL)
 
-# Store active simulations in memory (cache layer over Redis)
-active_simulations: Dict[str, Simulation] = {}
+# Simulations live in Redis so that every worker process sees the same state.
+# "sim:<id>" holds the pickled Simulation; SIM_INDEX_KEY is a hash of
+# id -> lightweight summary used for listing/counting without unpickling.
+SIMULATION_TTL = 3600
+SIM_INDEX_KEY = "sims:index"
+
+# Atomically drop index entries whose simulation has expired, then store the new
+# simulation and its index entry if the limit has not been reached.
+_RESERVE_SLOT_SCRIPT = redis_client.register_script("""
+for _, sid in ipairs(redis.call('HKEYS', KEYS[1])) do
+    if redis.call('EXISTS', 'sim:' .. sid) == 0 then
+        redis.call('HDEL', KEYS[1], sid)
+    end
+end
+if redis.call('HLEN', KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+redis.call('SET', 'sim:' .. ARGV[2], ARGV[4], 'EX', ARGV[5])
+redis.call('SET', 'sim:' .. ARGV[2] .. ':rev', ARGV[6], 'EX', ARGV[5])
+return 1
+""")
+
+# Every persisted copy is tagged with "<revision>:<process id>" under "sim:<id>:rev",
+# so a worker can tell whether its cached copy is still the one in Redis. The process
+# id keeps two workers that reached the same revision independently from matching.
+_PROCESS_ID = secrets.token_hex(4)
+
+def _version_token(sim: Simulation) -> bytes:
+    return f"{sim.revision}:{_PROCESS_ID}".encode()
+
+def _index_entry(sim: Simulation) -> bytes:
+    return orjson.dumps({
+        'current_time': sim.current_time,
+        'total_steps': len(sim.history),
+        'velocity': sim.state.velocity,
+        'mass': sim.params.mass,
+        'gravity': sim.params.gravity
+    }, option=ORJSON_OPTIONS)
+
+def reserve_simulation_slot(sim_id: str, sim: Simulation) -> bool:
+    """Persist a newly created simulation unless MAX_SIMULATIONS is reached"""
+    token = _version_token(sim)
+    stored = _RESERVE_SLOT_SCRIPT(keys=[SIM_INDEX_KEY],
+                                  args=[MAX_SIMULATIONS, sim_id, _index_entry(sim),
+                                        pickle.dumps(sim), SIMULATION_TTL, token])
+    if stored:
+        _cache_local(sim_id, sim, token)
+    return bool(stored)
+
+# Process-local LRU of recently used simulations in front of Redis (cache-aside).
+# Saves go to the LRU and a dirty map immediately; a background flusher batches
+# everything dirty into one Redis pipeline every FLUSH_INTERVAL seconds, so a burst
+# of /step calls on one simulation costs a single pickle + SET (write-behind). The
+# flusher pickles under the simulation's lock (sim_lock), which request handlers hold
+# while changing it, so a snapshot never sees a half-applied update.
+# Cached entries keep the version token they were saved or loaded with and are only
+# served while "sim:<id>:rev" still holds it, so another worker's write is picked up.
+LOCAL_CACHE_SIZE = 16
+FLUSH_INTERVAL = 0.05
+_local_sims: "OrderedDict[str, Tuple[Simulation, bytes]]" = OrderedDict()
+_local_lock = threading.Lock()
+_dirty: Dict[str, Tuple[Simulation, bytes]] = {}
+_dirty_lock = threading.Lock()
+_write_lock = threading.Lock()  # serializes Redis writes of flushes with deletes
+_flush_lock = threading.Lock()  # one flush at a time (flusher thread and atexit)
+_sim_locks: "weakref.WeakKeyDictionary[Simulation, threading.RLock]" = weakref.WeakKeyDictionary()
+_sim_locks_lock = threading.Lock()
+
+def sim_lock(sim: Simulation) -> threading.RLock:
+    """Lock guarding changes to (and snapshots of) one in-memory simulation"""
+    with _sim_locks_lock:
+        lock = _sim_locks.get(sim)
+        if lock is None:
+            lock = _sim_locks[sim] = threading.RLock()
+        return lock
+
+def _cache_local(sim_id: str, sim: Simulation, token: bytes):
+    with _local_lock:
+        _local_sims[sim_id] = (sim, token)
+        _local_sims.move_to_end(sim_id)
+        while len(_local_sims) > LOCAL_CACHE_SIZE:
+            _local_sims.popitem(last=False)
+
+def flush_dirty_simulations():
+    with _flush_lock:
+        with _dirty_lock:
+            if not _dirty:
+                return
+            pending = dict(_dirty)
+        
+        # Snapshot before taking _write_lock: handlers hold a sim lock while deleting
+        snapshots = {}
+        for sim_id, (sim, _) in pending.items():
+            with sim_lock(sim):
+                snapshots[sim_id] = (pickle.dumps(sim), _index_entry(sim), _version_token(sim))
+        
+        with _write_lock:
+            with _dirty_lock:
+                # Skip simulations deleted while they were being pickled
+                snapshots = {sim_id: snapshot for sim_id, snapshot in snapshots.items()
+                             if sim_id in _dirty}
+            if not snapshots:
+                return
+            try:
+                pipe = redis_client.pipeline(transaction=False)
+                for sim_id, (data, index_entry, token) in snapshots.items():
+                    pipe.set(f"sim:{sim_id}", data, ex=SIMULATION_TTL)
+                    pipe.set(f"sim:{sim_id}:rev", token, ex=SIMULATION_TTL)
+                    pipe.hset(SIM_INDEX_KEY, sim_id, index_entry)
+                pipe.execute()
+            except redis.RedisError as e:
+                # Entries stay dirty and are retried on the next flush
+                logger.error(f"Failed to persist {len(snapshots)} simulation(s): {str(e)}")
+                return
+        
+        with _dirty_lock:
+            # Entries leave the dirty map only once written, so loads keep serving the local
+            # copy meanwhile; an entry replaced by a newer save stays for the next flush
+            for sim_id in snapshots:
+                if _dirty.get(sim_id) is pending[sim_id]:
+                    del _dirty[sim_id]
+        with _local_lock:
+            # A snapshot may include changes made after the last save (e.g. a stream still
+            # running); tag the cached copy with the token actually written
+            for sim_id, (_, _, token) in snapshots.items():
+                cached = _local_sims.get(sim_id)
+                if cached is not None and cached[0] is pending[sim_id][0]:
+                    _local_sims[sim_id] = (cached[0], token)
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            flush_dirty_simulations()
+        except Exception as e:
+            logger.error(f"Unexpected error in Redis flusher: {str(e)}", exc_info=True)
+
+# Started on the first save in each process rather than at import, so workers forked
+# from a preloaded master (gunicorn --preload) run their own flusher
+_flusher_pid: Optional[int] = None
+_flusher_lock = threading.Lock()
+
+def _ensure_flusher():
+    global _flusher_pid
+    pid = os.getpid()
+    if _flusher_pid == pid:
+        return
+    with _flusher_lock:
+        if _flusher_pid != pid:
+            threading.Thread(target=_flush_loop, name='redis-flusher', daemon=True).start()
+            _flusher_pid = pid
+
+atexit.register(flush_dirty_simulations)
 
 def save_simulation(sim_id: str, sim: Simulation):
-    redis_client.setex(f"sim:{sim_id}", 3600, pickle.dumps(sim))
-    active_simulations[sim_id] = sim
-
-def load_simulation(sim_id: str) -> Simulation:
-    if sim_id in active_simulations:
-        return active_simulations[sim_id]
-    data = redis_client.get(f"sim:{sim_id}")
-    if data:
-        sim = pickle.loads(data)
-        active_simulations[sim_id] = sim
-        return sim
-    return None
+    token = _version_token(sim)
+    _cache_local(sim_id, sim, token)
+    with _dirty_lock:
+        _dirty[sim_id] = (sim, token)
+    _ensure_flusher()
+
+def load_simulation(sim_id: str) -> Optional[Simulation]:
+    with _dirty_lock:
+        entry = _dirty.get(sim_id)
+    if entry is not None:
+        # Saved here but not flushed yet: this process holds the newest copy
+        _cache_local(sim_id, *entry)
+        return entry[0]
+    
+    with _local_lock:
+        entry = _local_sims.get(sim_id)
+    if entry is not None and redis_client.get(f"sim:{sim_id}:rev") == entry[1]:
+        with _local_lock:
+            if sim_id in _local_sims:
+                _local_sims.move_to_end(sim_id)
+        return entry[0]
+    
+    data, token = redis_client.mget(f"sim:{sim_id}", f"sim:{sim_id}:rev")
+    if data is None:
+        return None
+    sim = pickle.loads(data)
+    # Derived responses memoized for the replaced copy no longer apply
+    invalidate_history_cache(sim_id)
+    _cache_local(sim_id, sim, token)
+    return sim
 
 def delete_simulation(sim_id: str):
-    active_simulations.pop(sim_id, None)
-    redis_client.delete(f"sim:{sim_id}")
+    invalidate_history_cache(sim_id)
+    with _local_lock:
+        _local_sims.pop(sim_id, None)
+    with _write_lock:
+        with _dirty_lock:
+            _dirty.pop(sim_id, None)
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.delete(f"sim:{sim_id}", f"sim:{sim_id}:rev")
+        pipe.hdel(SIM_INDEX_KEY, sim_id)
+        pipe.execute()
+
+def count_simulations() -> int:
+    return redis_client.hlen(SIM_INDEX_KEY)
+
+# Per-simulation memo of (revision, history dicts, summary statistics) so that
+# repeated polling of an unchanged simulation is O(1); bounded like _local_sims.
+# History lists longer than HISTORY_CACHE_MAX_STEPS (~0.5 KB per step) are rebuilt per
+# request instead of being kept alive; their summary statistics are still memoized.
+HISTORY_CACHE_MAX_STEPS = 10_000
+_history_cache: "OrderedDict[str, Tuple[int, Optional[List[Dict]], Dict]]" = OrderedDict()
+_history_lock = threading.Lock()
+
+def invalidate_history_cache(sim_id: str):
+    with _history_lock:
+        _history_cache.pop(sim_id, None)
+
+def get_cached_history(sim_id: str, sim: Simulation, include_history: bool = True) -> Tuple[Optional[List[Dict]], Dict]:
+    revision = sim.revision
+    with _history_lock:
+        cached = _history_cache.get(sim_id)
+    if cached and cached[0] == revision:
+        _, history, stats = cached
+    else:
+        history, stats = None, sim.get_summary_statistics()
+    if include_history and history is None:
+        history = [state.to_dict() for state in sim.history]
+    cached_history = history if history is not None and len(history) <= HISTORY_CACHE_MAX_STEPS else None
+    with _history_lock:
+        _history_cache[sim_id] = (revision, cached_history, stats)
+        _history_cache.move_to_end(sim_id)
+        while len(_history_cache) > LOCAL_CACHE_SIZE:
+            _history_cache.popitem(last=False)
+    return history, stats
 
 # Constants
 MAX_SIMULATIONS = 100
 MAX_DURATION = 300.0
 MAX_PARAMETER_SWEEP_VALUES = 50
+MAX_SWEEP_TOTAL_STEPS = 150_000  # integration steps summed over all sweep values (1500 s at dt=0.01)
+
+# Sweep iterations are independent CPU-bound runs, so fan them out across processes.
+# The pool is created on the first sweep, and its workers are spawned rather than forked
+# from this multi-threaded process. The task itself (run_sweep_value) only needs
+# phyvista_backend, but spawn also re-imports the main script as __mp_main__: under
+# gunicorn that is gunicorn itself, while with `python phyvista_api.py` each worker
+# imports this whole module (Redis client, SocketIO, kernel warm-up) once at startup.
+_sweep_pool: Optional[ProcessPoolExecutor] = None
+_sweep_pool_lock = threading.Lock()
+
+def get_sweep_pool() -> ProcessPoolExecutor:
+    global _sweep_pool
+    with _sweep_pool_lock:
+        if _sweep_pool is None:
+            _sweep_pool = ProcessPoolExecutor(max_workers=os.cpu_count(),
+                                              mp_context=multiprocessing.get_context('spawn'))
+        return _sweep_pool
+
+def discard_sweep_pool(pool: ProcessPoolExecutor):
+    """Drop a pool broken by a dead worker (e.g. OOM kill) so the next sweep starts a new one"""
+    global _sweep_pool
+    with _sweep_pool_lock:
+        if _sweep_pool is pool:
+            _sweep_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
 
 
 # --- OPTIMIZED JSON ENCODER ---
 from flask.json.provider import DefaultJSONProvider
 
-class NumpyProvider(DefaultJSONProvider):
-    def default(self, obj):
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson; ndarrays and NumPy scalars are encoded in C"""
+    sort_keys = False
+
+    @staticmethod
+    def _fallback(obj):
         if isinstance(obj, np.ndarray):
+            # Non-contiguous or unsupported dtypes are rejected by OPT_SERIALIZE_NUMPY
             return obj.tolist()
-        if isinstance(obj, (np.floating, np.float32, np.float64)):
-            return float(obj)
-        if isinstance(obj, (np.integer, np.int32, np.int64)):
-            return int(obj)
-        if isinstance(obj, np.bool_):
-            return bool(obj)
-        if isinstance(obj, np.complexfloating):
+        if isinstance(obj, (complex, np.complexfloating)):
             return {'real': float(obj.real), 'imag': float(obj.imag)}
-        return super().default(obj)
+        if isinstance(obj, Enum):
+            return obj.value
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, default=self._fallback, option=ORJSON_OPTIONS).decode()
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+
+app.json = OrjsonProvider(app)
 
 
+# --- NDJSON STREAMING ---
+def wants_stream() -> bool:
+    return request.args.get('stream', '').lower() in ('1', 'true', 'yes')
+
+
+def ndjson_response(records: Iterable[Any]) -> Response:
+    """Stream records as newline-delimited JSON, encoding one record at a time"""
+    def generate():
+        for record in records:
+            yield orjson.dumps(record, default=OrjsonProvider._fallback, option=ORJSON_OPTIONS) + b'\n'
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 
 # --- ERROR HANDLING DECORATORS ---
+def error_response(e: Exception, name: str):
+    if isinstance(e, KeyError):
+        logger.error(f"KeyError in {name}: {str(e)}")
+        return jsonify({'error': f'Missing required field: {str(e)}'}), 400
+    if isinstance(e, ValueError):
+        logger.error(f"ValueError in {name}: {str(e)}")
+        return jsonify({'error': f'Invalid value: {str(e)}'}), 400
+    if isinstance(e, TypeError):
+        logger.error(f"TypeError in {name}: {str(e)}")
+        return jsonify({'error': f'Type error: {str(e)}'}), 400
+    logger.error(f"Unexpected error in {name}: {str(e)}", exc_info=True)
+    return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+
+
 def handle_errors(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         try:
             return f(*args, **kwargs)
-        except KeyError as e:
-            logger.error(f"KeyError in {f.__name__}: {str(e)}")
-            return jsonify({'error': f'Missing required field: {str(e)}'}), 400
-        except ValueError as e:
-            logger.error(f"ValueError in {f.__name__}: {str(e)}")
-            return jsonify({'error': f'Invalid value: {str(e)}'}), 400
-        except TypeError as e:
-            logger.error(f"TypeError in {f.__name__}: {str(e)}")
-            return jsonify({'error': f'Type error: {str(e)}'}), 400
         except Exception as e:
-            logger.error(f"Unexpected error in {f.__name__}: {str(e)}", exc_info=True)
-            return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+            return error_response(e, f.__name__)
     return decorated_function
 
 
-def validate_simulation_exists(f):
+def simulation_endpoint(f):
+    """Error handling plus a single simulation lookup; the handler receives (sim_id, sim)"""
     @wraps(f)
     def decorated_function(sim_id: str, *args, **kwargs):
-        sim = load_simulation(sim_id)
-        if sim is None:
-            return jsonify({'error': 'Simulation not found'}), 404
-        return f(sim_id, *args, **kwargs)
+        try:
+            sim = load_simulation(sim_id)
+            if sim is None:
+                return jsonify({'error': 'Simulation not found'}), 404
+            with sim_lock(sim):
+                return f(sim_id, sim, *args, **kwargs)
+        except Exception as e:
+            return error_response(e, f.__name__)
     return decorated_function
 
 
+# --- CONDITIONAL GET ---
+def simulation_etag(sim: Simulation) -> str:
+    return f"{len(sim.history)}-{sim.current_time:.6f}-{sim.revision}"
+
+
+def is_not_modified(etag: str) -> bool:
+    return request.if_none_match.contains_weak(etag)
+
+
+def not_modified_response(etag: str) -> Response:
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    return response
+
+
+def with_etag(response: Response, etag: str) -> Response:
+    response.set_etag(etag, weak=True)
+    return response
+
+
 # --- VALIDATION FUNCTIONS ---
+def get_json_body() -> Dict:
+    """Parse the raw request body with orjson; an empty body yields {}"""
+    body = request.get_data(cache=False)
+    if not body:
+        return {}
+    data = orjson.loads(body)
+    if not isinstance(data, dict):
+        raise TypeError(f"Request body must be a JSON object, got {type(data).__name__}")
+    return data
+
+
 def validate_positive_number(value: float, name: str, allow_zero: bool = False) -> None:
-    if allow_zero and value < 0:
-        raise ValueError(f"{name} must be non-negative, got {value}")
-    elif not allow_zero and value <= 0:
-        raise ValueError(f"{name} must be positive, got {value}")
+    # Single comparison on the common (valid) path; also rejects NaN
+    if value > 0 or (allow_zero and value == 0):
+        return
+    raise ValueError(f"{name} must be {'non-negative' if allow_zero else 'positive'}, got {value}")
 
 
 def validate_range(value: float, name: str, min_val: float, max_val: float) -> None:
@@ -131,13 +464,17 @@ def validate_range(value: float, name: str, min_val: float, max_val: float) -> N
         raise ValueError(f"{name} must be between {min_val} and {max_val}, got {value}")
 
 
+_GRAVITY_PRESETS: Dict[str, float] = {e.name: e.value for e in GravityEnvironment}
+_GRAVITY_OPTIONS_STR = ', '.join(_GRAVITY_PRESETS)
+
+
 def parse_gravity(gravity_input) -> float:
     if isinstance(gravity_input, str):
-        gravity_upper = gravity_input.upper()
-        if not hasattr(GravityEnvironment, gravity_upper):
+        gravity = _GRAVITY_PRESETS.get(gravity_input.upper())
+        if gravity is None:
             raise ValueError(f"Invalid gravity preset: {gravity_input}. "
-                           f"Valid options: {', '.join([e.name for e in GravityEnvironment])}")
-        return GravityEnvironment[gravity_upper].value
+                             f"Valid options: {_GRAVITY_OPTIONS_STR}")
+        return gravity
     elif isinstance(gravity_input, (int, float)):
         validate_positive_number(gravity_input, "gravity")
         return float(gravity_input)
@@ -150,7 +487,7 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'version': '1.0.0',
-        'active_simulations': len(active_simulations),
+        'active_simulations': count_simulations(),
         'max_simulations': MAX_SIMULATIONS
     })
 
@@ -158,10 +495,7 @@ def health_check():
 @api_v1.route('/simulation/create', methods=['POST'])
 @handle_errors
 def create_simulation():
-    if len(active_simulations) >= MAX_SIMULATIONS:
-        return jsonify({'error': f'Maximum number of simulations ({MAX_SIMULATIONS}) reached.'}), 429
-    
-    data = request.json
+    data = get_json_body()
     if not data:
         return jsonify({'error': 'Request body is required'}), 400
     
@@ -195,6 +529,8 @@ def create_simulation():
     )
     
     pid_gains = data.get('pid_gains', {})
+    if not isinstance(pid_gains, dict):
+        raise TypeError(f"pid_gains must be an object, got {type(pid_gains).__name__}")
     kp = float(pid_gains.get('kp', 0.5))
     ki = float(pid_gains.get('ki', 0.1))
     kd = float(pid_gains.get('kd', 0.2))
@@ -212,8 +548,9 @@ def create_simulation():
         dt=dt
     )
     
-    sim_id = str(uuid.uuid4())
-    save_simulation(sim_id, sim)
+    sim_id = secrets.token_hex(16)
+    if not reserve_simulation_slot(sim_id, sim):
+        return jsonify({'error': f'Maximum number of simulations ({MAX_SIMULATIONS}) reached.'}), 429
     
     logger.info(f"Created simulation {sim_id}")
     
@@ -234,11 +571,9 @@ def create_simulation():
 
 
 @api_v1.route('/simulation/<sim_id>/step', methods=['POST'])
-@handle_errors
-@validate_simulation_exists
-def step_simulation(sim_id: str):
-    sim = load_simulation(sim_id)
-    data = request.json or {}
+@simulation_endpoint
+def step_simulation(sim_id: str, sim: Simulation):
+    data = get_json_body()
     
     if 'target_angle' in data:
         target_angle = float(data['target_angle'])
@@ -246,17 +581,16 @@ def step_simulation(sim_id: str):
         sim.target_angle = target_angle
     
     result = sim.step()
+    invalidate_history_cache(sim_id)
     save_simulation(sim_id, sim)
     
     return jsonify(result)
 
 
 @api_v1.route('/simulation/<sim_id>/run', methods=['POST'])
-@handle_errors
-@validate_simulation_exists
-def run_simulation(sim_id: str):
-    sim = load_simulation(sim_id)
-    data = request.json or {}
+@simulation_endpoint
+def run_simulation(sim_id: str, sim: Simulation):
+    data = get_json_body()
     
     duration = float(data.get('duration', 10.0))
     validate_range(duration, "duration", 0.0, MAX_DURATION)
@@ -264,23 +598,62 @@ def run_simulation(sim_id: str):
     target_angle = float(data.get('target_angle', 0.0))
     validate_range(target_angle, "target_angle", -90.0, 90.0)
     
+    max_points = request.args.get('max_points')
+    if max_points is not None:
+        try:
+            max_points = int(max_points)
+        except ValueError:
+            raise ValueError(f"max_points must be an integer, got {max_points!r}")
+    
     logger.info(f"Running simulation {sim_id} for {duration}s with target {target_angle}°")
     
-    results = sim.run(duration, target_angle)
+    invalidate_history_cache(sim_id)
+    
+    if wants_stream():
+        # Validated here so bad arguments get a 400 instead of breaking off a 200 stream
+        steps = sim.run_iter(duration, target_angle)
+        
+        def records() -> Iterator[Dict]:
+            total_steps = 0
+            try:
+                while True:
+                    # The handler's lock is released once streaming starts, so take it
+                    # for each step computed rather than across client writes
+                    with sim_lock(sim):
+                        result = next(steps, None)
+                    if result is None:
+                        break
+                    total_steps += 1
+                    yield result
+            finally:
+                # Persist the steps taken so far also when the client disconnects mid-stream
+                save_simulation(sim_id, sim)
+            with sim_lock(sim):
+                _, summary = get_cached_history(sim_id, sim, include_history=False)
+            yield {'summary': summary, 'total_steps': total_steps}
+        return ndjson_response(records())
+    
+    if max_points is not None:
+        # Evenly spaced samples, always keeping the first and last step; only the
+        # sampled steps are turned into dictionaries
+        results, total_steps = sim.run_sampled(duration, target_angle, max_points)
+    else:
+        results = sim.run(duration, target_angle)
+        total_steps = len(results)
+    save_simulation(sim_id, sim)
+    _, summary = get_cached_history(sim_id, sim, include_history=False)
     
     return jsonify({
         'results': results,
-        'summary': sim.get_summary_statistics(),
-        'total_steps': len(results)
+        'summary': summary,
+        'total_steps': total_steps
     })
 
 
 @api_v1.route('/simulation/<sim_id>/reset', methods=['POST'])
-@handle_errors
-@validate_simulation_exists
-def reset_simulation(sim_id: str):
-    sim = load_simulation(sim_id)
-    data = request.json or {}
+@simulation_endpoint
+def reset_simulation(sim_id: str, sim: Simulation):
+    data = get_json_body()
     
     initial_velocity = None
     if 'initial_velocity' in data:
@@ -288,6 +661,7 @@ def reset_simulation(sim_id: str):
         validate_positive_number(initial_velocity, "initial_velocity", allow_zero=True)
     
     sim.reset(initial_velocity=initial_velocity)
+    invalidate_history_cache(sim_id)
     save_simulation(sim_id, sim)
     
     logger.info(f"Reset simulation {sim_id}")
@@ -299,36 +673,39 @@ def reset_simulation(sim_id: str):
 
 
 @api_v1.route('/simulation/<sim_id>/update_params', methods=['PUT'])
-@handle_errors
-@validate_simulation_exists
-def update_parameters(sim_id: str):
-    sim = load_simulation(sim_id)
-    data = request.json
+@simulation_endpoint
+def update_parameters(sim_id: str, sim: Simulation):
+    data = get_json_body()
     
     if not data:
         return jsonify({'error': 'Request body is required'}), 400
     
+    # Validate everything up front so a bad field cannot leave a partial update,
+    # then hand the checked values to the simulation in one call
+    updates = {}
+    
     if 'velocity' in data:
         velocity = float(data['velocity'])
         validate_positive_number(velocity, "velocity", allow_zero=True)
-        sim.state.velocity = velocity
+        updates['velocity'] = velocity
     
     if 'mass' in data:
         mass = float(data['mass'])
         validate_positive_number(mass, "mass")
-        sim.params.mass = mass
+        updates['mass'] = mass
     
     if 'friction_coefficient' in data:
         friction = float(data['friction_coefficient'])
         validate_range(friction, "friction_coefficient", 0.0, 2.0)
-        sim.params.friction_coefficient = friction
+        updates['friction_coefficient'] = friction
     
     if 'gravity' in data:
-        gravity = parse_gravity(data['gravity'])
-        sim.params.gravity = gravity
+        updates['gravity'] = parse_gravity(data['gravity'])
     
     if 'pid_gains' in data:
         gains = data['pid_gains']
+        if not isinstance(gains, dict):
+            raise TypeError(f"pid_gains must be an object, got {type(gains).__name__}")
         kp = float(gains.get('kp', sim.controller.kp))
         ki = float(gains.get('ki', sim.controller.ki))
         kd = float(gains.get('kd', sim.controller.kd))
@@ -337,8 +714,10 @@ def update_parameters(sim_id: str):
         validate_positive_number(ki, "ki", allow_zero=True)
         validate_positive_number(kd, "kd", allow_zero=True)
         
-        sim.controller.set_gains(kp, ki, kd)
+        updates['pid_gains'] = (kp, ki, kd)
     
+    sim.apply_params_unchecked(**updates)
+    invalidate_history_cache(sim_id)
     save_simulation(sim_id, sim)
     logger.info(f"Updated parameters for simulation {sim_id}")
     
@@ -359,29 +738,57 @@ def update_parameters(sim_id: str):
 
 
 @api_v1.route('/simulation/<sim_id>/history', methods=['GET'])
-@handle_errors
-@validate_simulation_exists
-def get_history(sim_id: str):
-    sim = load_simulation(sim_id)
-    return jsonify({
-        'history': [state.to_dict() for state in sim.history],
-        'summary': sim.get_summary_statistics(),
-        'total_steps': len(sim.history)
-    })
+@simulation_endpoint
+def get_history(sim_id: str, sim: Simulation):
+    etag = simulation_etag(sim)
+    if is_not_modified(etag):
+        return not_modified_response(etag)
+    
+    if wants_stream():
+        def records() -> Iterator[Dict]:
+            for state in sim.history:
+                yield state.to_dict()
+            _, summary = get_cached_history(sim_id, sim, include_history=False)
+            yield {'summary': summary, 'total_steps': len(sim.history)}
+        return with_etag(ndjson_response(records()), etag)
+    
+    if request.args.get('format') == 'columns':
+        _, summary = get_cached_history(sim_id, sim, include_history=False)
+        return with_etag(jsonify({
+            'columns': sim.history_columns(),
+            'summary': summary,
+            'total_steps': len(sim.history)
+        }), etag)
+    
+    history, summary = get_cached_history(sim_id, sim)
+    return with_etag(jsonify({
+        'history': history,
+        'summary': summary,
+        'total_steps': len(history)
+    }), etag)
+
+
+@api_v1.route('/simulation/<sim_id>/history.npy', methods=['GET'])
+@simulation_endpoint
+def get_history_npy(sim_id: str, sim: Simulation):
+    buffer = io.BytesIO()
+    np.lib.format.write_array(buffer, sim.history_array, allow_pickle=False)
+    return Response(buffer.getvalue(), mimetype='application/octet-stream')
 
 
 @api_v1.route('/simulation/<sim_id>/statistics', methods=['GET'])
-@handle_errors
-@validate_simulation_exists
-def get_statistics(sim_id: str):
-    sim = load_simulation(sim_id)
-    return jsonify(sim.get_summary_statistics())
+@simulation_endpoint
+def get_statistics(sim_id: str, sim: Simulation):
+    etag = simulation_etag(sim)
+    if is_not_modified(etag):
+        return not_modified_response(etag)
+    _, summary = get_cached_history(sim_id, sim, include_history=False)
+    return with_etag(jsonify(summary), etag)
 
 
 @api_v1.route('/simulation/<sim_id>', methods=['DELETE'])
-@handle_errors
-@validate_simulation_exists
-def delete_simulation_route(sim_id: str):
+@simulation_endpoint
+def delete_simulation_route(sim_id: str, sim: Simulation):
     delete_simulation(sim_id)
     logger.info(f"Deleted simulation {sim_id}")
     return jsonify({'status': 'deleted', 'simulation_id': sim_id})
@@ -389,44 +796,118 @@ def delete_simulation_route(sim_id: str):
 
 @api_v1.route('/simulation/list', methods=['GET'])
 def list_simulations():
+    index = redis_client.hgetall(SIM_INDEX_KEY)
+    sim_ids = [sid.decode() for sid in index]
+    
+    pipe = redis_client.pipeline(transaction=False)
+    for sim_id in sim_ids:
+        pipe.exists(f"sim:{sim_id}")
+    alive = pipe.execute()
+    
     simulations = []
-    for sim_id, sim in active_simulations.items():
-        simulations.append({
-            'simulation_id': sim_id,
-            'current_time': sim.current_time,
-            'total_steps': len(sim.history),
-            'velocity': sim.state.velocity,
-            'mass': sim.params.mass,
-            'gravity': sim.params.gravity
-        })
-    return jsonify({
+    expired = []
+    digest = hashlib.blake2b(digest_size=16)
+    for sim_id, entry, exists in zip(sim_ids, index.values(), alive):
+        if not exists:
+            expired.append(sim_id)
+            continue
+        simulations.append({'simulation_id': sim_id, **orjson.loads(entry)})
+        digest.update(sim_id.encode())
+        digest.update(entry)
+    if expired:
+        redis_client.hdel(SIM_INDEX_KEY, *expired)
+    
+    etag = digest.hexdigest()
+    if is_not_modified(etag):
+        return not_modified_response(etag)
+    
+    return with_etag(jsonify({
         'simulations': simulations,
         'total_count': len(simulations)
-    })
+    }), etag)
+
+
+# Preset payloads never change, so they are encoded once at import. A fresh
+# Response is still built per request because after_request hooks (CORS,
+# compression) mutate the response object.
+_GRAVITY_PRESETS_BODY = orjson.dumps({'presets': _GRAVITY_PRESETS})
+_PID_PRESETS_BODY = orjson.dumps({
+    'presets': {
+        'aggressive': {'kp': 1.5, 'ki': 0.3, 'kd': 0.5},
+        'balanced': {'kp': 0.5, 'ki': 0.1, 'kd': 0.2},
+        'smooth': {'kp': 0.2, 'ki': 0.05, 'kd': 0.1}
+    }
+})
+PRESET_CACHE_CONTROL = 'public, max-age=86400'
+
+
+def static_json_response(body: bytes) -> Response:
+    response = Response(body, mimetype='application/json')
+    response.headers['Cache-Control'] = PRESET_CACHE_CONTROL
+    return response
 
 
 @api_v1.route('/presets/gravity', methods=['GET'])
 def get_gravity_presets():
-    return jsonify({
-        'presets': {env.name: env.value for env in GravityEnvironment}
-    })
+    return static_json_response(_GRAVITY_PRESETS_BODY)
 
 
 @api_v1.route('/presets/pid', methods=['GET'])
 def get_pid_presets():
-    return jsonify({
-        'presets': {
-            'aggressive': {'kp': 1.5, 'ki': 0.3, 'kd': 0.5},
-            'balanced': {'kp': 0.5, 'ki': 0.1, 'kd': 0.2},
-            'smooth': {'kp': 0.2, 'ki': 0.05, 'kd': 0.1}
-        }
-    })
+    return static_json_response(_PID_PRESETS_BODY)
+
+
+@dataclass(frozen=True)
+class SweepConfig:
+    """Typed parameter-sweep base configuration, parsed once per request"""
+    mass: float = 500.0
+    gravity: float = 1.62
+    friction_coefficient: float = 0.7
+    wheelbase: float = 2.5
+    max_steering_angle: float = 45.0
+    initial_velocity: float = 10.0
+    dt: float = 0.01
+    kp: float = 0.5
+    ki: float = 0.1
+    kd: float = 0.2
+    
+    @classmethod
+    def from_dict(cls, config: Dict) -> 'SweepConfig':
+        if not isinstance(config, dict):
+            raise TypeError(f"base_config must be an object, got {type(config).__name__}")
+        values = {f.name: float(config[f.name])
+                  for f in fields(cls) if f.name in config and f.name != 'gravity'}
+        if 'gravity' in config:
+            values['gravity'] = parse_gravity(config['gravity'])
+        if 'dt' in values:
+            validate_range(values['dt'], "dt", 0.0001, 1.0)
+        gains = config.get('pid_gains', {})
+        if not isinstance(gains, dict):
+            raise TypeError(f"pid_gains must be an object, got {type(gains).__name__}")
+        values.update({k: float(v) for k, v in gains.items() if k in ('kp', 'ki', 'kd')})
+        return cls(**values)
+    
+    def build_simulation(self) -> Simulation:
+        params = PhysicsParameters(
+            mass=self.mass,
+            gravity=self.gravity,
+            friction_coefficient=self.friction_coefficient,
+            wheelbase=self.wheelbase,
+            max_steering_angle=self.max_steering_angle
+        )
+        controller = PIDController(kp=self.kp, ki=self.ki, kd=self.kd)
+        return Simulation(params, controller, initial_velocity=self.initial_velocity, dt=self.dt)
+
+
+def _sweep_error(parameter: str, value: Any, e: Exception) -> Dict:
+    logger.error(f"Error in sweep for {parameter}={value}: {str(e)}")
+    return {'parameter_value': value, 'error': str(e)}
 
 
 @api_v1.route('/analysis/parameter_sweep', methods=['POST'])
 @handle_errors
 def parameter_sweep():
-    data = request.json
+    data = get_json_body()
     
     if not data:
         return jsonify({'error': 'Request body is required'}), 400
@@ -448,48 +929,58 @@ def parameter_sweep():
     target_angle = float(data.get('target_angle', 15.0))
     validate_range(target_angle, "target_angle", -90.0, 90.0)
     
-    base_config = data.get('base_config', {})
-    results = []
+    # Validated once; each sweep value only clones this and overrides one field
+    template = SweepConfig.from_dict(data.get('base_config', {})).build_simulation()
     
     logger.info(f"Starting parameter sweep: {parameter} with {len(values)} values")
     
+    results: List[Optional[Dict]] = [None] * len(values)
+    overrides: Dict[int, Any] = {}
     for idx, value in enumerate(values):
         try:
-            config = base_config.copy()
-            config[parameter] = value
-            
-            gravity_val = config.get('gravity', 1.62)
-            if isinstance(gravity_val, str):
-                gravity_val = parse_gravity(gravity_val)
-            
-            params = PhysicsParameters(
-                mass=float(config.get('mass', 500.0)),
-                gravity=gravity_val,
-                friction_coefficient=float(config.get('friction_coefficient', 0.7)),
-                wheelbase=float(config.get('wheelbase', 2.5)),
-                max_steering_angle=float(config.get('max_steering_angle', 45.0))
-            )
-            
-            pid_config = config.get('pid_gains', {})
-            controller = PIDController(
-                kp=float(pid_config.get('kp', 0.5)),
-                ki=float(pid_config.get('ki', 0.1)),
-                kd=float(pid_config.get('kd', 0.2))
-            )
-            
-            initial_vel = float(config.get('initial_velocity', 10.0))
-            dt = float(config.get('dt', 0.01))
-            
-            sim = Simulation(params, controller, initial_velocity=initial_vel, dt=dt)
-            sim.run(duration, target_angle)
-            stats = sim.get_summary_statistics()
-            
-            results.append({'parameter_value': value, 'statistics': stats})
-            logger.info(f"Completed sweep iteration {idx + 1}/{len(values)}")
-            
+            if parameter == 'gravity':
+                override = parse_gravity(value)
+            elif parameter == 'dt':
+                override = float(value)
+                validate_range(override, "dt", 0.0001, 1.0)
+            else:
+                override = value
+        except (ValueError, TypeError) as e:
+            results[idx] = _sweep_error(parameter, value, e)
+            continue
+        overrides[idx] = override
+    
+    # Bound the work by integration steps rather than simulated seconds, since dt can vary
+    total_steps = sum(math.ceil(duration / (override if parameter == 'dt' else template.dt))
+                      for override in overrides.values())
+    if total_steps > MAX_SWEEP_TOTAL_STEPS:
+        return jsonify({'error': f'Sweep too large. Total steps ({total_steps}) must not exceed '
+                                 f'{MAX_SWEEP_TOTAL_STEPS}'}), 400
+    
+    pool = get_sweep_pool()
+    futures = {}
+    for idx, override in overrides.items():
+        args = (run_sweep_value, template, {parameter: override}, duration, target_angle)
+        try:
+            future = pool.submit(*args)
+        except BrokenProcessPool:
+            # A worker died during an earlier sweep; replace the pool and carry on
+            discard_sweep_pool(pool)
+            pool = get_sweep_pool()
+            future = pool.submit(*args)
+        futures[future] = idx
+    
+    for completed, future in enumerate(as_completed(futures), start=1):
+        idx = futures[future]
+        value = values[idx]
+        try:
+            results[idx] = {'parameter_value': value, 'statistics': future.result()}
+        except BrokenProcessPool as e:
+            discard_sweep_pool(pool)
+            results[idx] = _sweep_error(parameter, value, e)
         except Exception as e:
-            logger.error(f"Error in sweep iteration {idx + 1}: {str(e)}")
-            results.append({'parameter_value': value, 'error': str(e)})
+            results[idx] = _sweep_error(parameter, value, e)
+        logger.info(f"Completed sweep iteration {completed}/{len(futures)}")
     
     return jsonify({
         'parameter': parameter,
@@ -510,9 +1001,11 @@ def handle_step(data):
         emit('error', {'message': 'Simulation not found'})
         return
 
-    sim.target_angle = target_angle
-    result = sim.step()
-    save_simulation(sim_id, sim)
+    with sim_lock(sim):
+        sim.target_angle = target_angle
+        result = sim.step()
+        invalidate_history_cache(sim_id)
+        save_simulation(sim_id, sim)
     emit('step_result', result)
 # ----------------------------
 
@@ -532,6 +1025,10 @@ def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
 
+# Registered at import so WSGI servers (gunicorn) serve the API, not just __main__
+app.register_blueprint(api_v1)
+
+
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 5000))
     
@@ -547,6 +1044,7 @@ if __name__ == '__main__':
     print("  POST   /api/v1/simulation/<id>/reset")
     print("  PUT    /api/v1/simulation/<id>/update_params")
     print("  GET    /api/v1/simulation/<id>/history")
+    print("  GET    /api/v1/simulation/<id>/history.npy")
     print("  GET    /api/v1/simulation/<id>/statistics")
     print("  DELETE /api/v1/simulation/<id>")
     print("  GET    /api/v1/presets/gravity")
@@ -558,6 +1056,4 @@ if __name__ == '__main__':
     print(f"Maximum duration: {MAX_DURATION}s")
     print("=" * 60 + "\n")
     
-    app.register_blueprint(api_v1)
-    
     socketio.run(app, host='0.0.0.0', port=port, debug=False, allow_unsafe_werkzeug=True)
\ No newline at end of file
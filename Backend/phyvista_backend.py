@@ -4,12 +4,31 @@ A physics-based simulation engine for studying vehicle dynamics under varying gr
 Optimized version with bug fixes and improved physics calculations
 """
 
+import math
 import numpy as np
-from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Tuple
+from dataclasses import dataclass, field, fields, replace
+from typing import List, Dict, Optional, Tuple, Iterator
+from collections.abc import Sequence
 import json
 from enum import Enum
 import warnings
+from functools import lru_cache
+
+try:
+    from numba import njit, prange, vectorize
+except ImportError:  # numba is optional; kernels then run as plain Python
+    vectorize = None
+    
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+    prange = range
+
+try:
+    import orjson
+except ImportError:  # orjson is optional for the engine; export_history falls back to json
+    orjson = None
 
 
 class GravityEnvironment(Enum):
@@ -20,46 +39,74 @@ class GravityEnvironment(Enum):
     CUSTOM = 0.0
 
 
-@dataclass
+@dataclass(init=False)
 class VehicleState:
     """Represents the complete state of the vehicle at a given time"""
+    __slots__ = ('time', 'pos_x', 'pos_y', 'velocity', 'heading', 'steering_angle', 'angular_velocity')
+    
     time: float
-    position: np.ndarray  # [x, y] in meters
+    pos_x: float  # meters
+    pos_y: float  # meters
     velocity: float  # m/s
     heading: float  # radians
     steering_angle: float  # degrees
     angular_velocity: float  # rad/s
     
-    def __post_init__(self):
-        """Validate state after initialization"""
-        if not isinstance(self.position, np.ndarray):
-            self.position = np.array(self.position, dtype=np.float64)
-        elif self.position.dtype != np.float64:
-            self.position = self.position.astype(np.float64)
-        
-        # Ensure position is 1D array with 2 elements
-        if self.position.shape != (2,):
-            raise ValueError(f"Position must be 2D array, got shape {self.position.shape}")
+    def __init__(self, time: float, position, velocity: float, heading: float,
+                 steering_angle: float, angular_velocity: float):
+        """
+        Args:
+            position: [x, y] in meters (any 2-element sequence)
+        """
+        self.time = time
+        self.position = position
+        self.velocity = velocity
+        self.heading = heading
+        self.steering_angle = steering_angle
+        self.angular_velocity = angular_velocity
+    
+    @property
+    def position(self) -> np.ndarray:
+        """Position [x, y] in meters, built on access"""
+        return np.array([self.pos_x, self.pos_y], dtype=np.float64)
+    
+    @position.setter
+    def position(self, value):
+        # Ensure position has exactly 2 elements
+        if (isinstance(value, np.ndarray) and value.shape != (2,)) or len(value) != 2:
+            raise ValueError(f"Position must be 2D array, got shape {np.shape(value)}")
+        self.pos_x = float(value[0])
+        self.pos_y = float(value[1])
+    
+    def __setstate__(self, state):
+        # Accepts slot state as well as older pickles that stored 'position'
+        # (or a __dict__, from before __slots__ was added)
+        if isinstance(state, tuple):
+            state = {**(state[0] or {}), **state[1]}
+        for name, value in state.items():
+            setattr(self, name, value)
     
     def to_dict(self) -> Dict:
         """Convert state to dictionary for JSON serialization"""
+        heading = float(self.heading)
+        angular_velocity = float(self.angular_velocity)
         return {
             'time': float(self.time),
-            'position_x': float(self.position[0]),
-            'position_y': float(self.position[1]),
+            'position_x': self.pos_x,
+            'position_y': self.pos_y,
             'velocity': float(self.velocity),
-            'heading_deg': float(np.degrees(self.heading)),
-            'heading_rad': float(self.heading),
+            'heading_deg': math.degrees(heading),
+            'heading_rad': heading,
             'steering_angle': float(self.steering_angle),
-            'angular_velocity_rad': float(self.angular_velocity),
-            'angular_velocity_deg': float(np.degrees(self.angular_velocity))
+            'angular_velocity_rad': angular_velocity,
+            'angular_velocity_deg': math.degrees(angular_velocity)
         }
     
     def copy(self) -> 'VehicleState':
-        """Create a deep copy of the state"""
+        """Create a copy of the state"""
         return VehicleState(
             time=self.time,
-            position=self.position.copy(),
+            position=(self.pos_x, self.pos_y),
             velocity=self.velocity,
             heading=self.heading,
             steering_angle=self.steering_angle,
@@ -88,18 +135,51 @@ class PhysicsParameters:
             raise ValueError(f"Wheelbase must be positive, got {self.wheelbase}")
         if not 0 <= self.max_steering_angle <= 90:
             raise ValueError(f"Max steering angle must be between 0 and 90 degrees, got {self.max_steering_angle}")
+        self._update_derived()
+    
+    def _update_derived(self):
+        """Cache constants derived from the fields (N = mg, F_max = μN, a_max = μg)"""
+        normal_force = self.mass * self.gravity
+        object.__setattr__(self, '_normal_force', normal_force)
+        object.__setattr__(self, '_max_friction_force', self.friction_coefficient * normal_force)
+        object.__setattr__(self, '_max_lateral_acceleration', self.friction_coefficient * self.gravity)
+    
+    def __setattr__(self, name, value):
+        # Fields are updated in place mid-simulation (Simulation.apply_params_unchecked),
+        # so keep the cached constants in sync once __post_init__ has created them
+        object.__setattr__(self, name, value)
+        if name in _PARAMETER_FIELDS and '_max_lateral_acceleration' in self.__dict__:
+            self._update_derived()
+    
+    def __setstate__(self, state: Dict):
+        self.__dict__.update(state)
+        if '_max_lateral_acceleration' not in state:
+            # Pickled before derived constants were cached
+            self._update_derived()
     
     def normal_force(self) -> float:
         """Calculate normal force: N = mg"""
-        return self.mass * self.gravity
+        return self._normal_force
     
     def max_friction_force(self) -> float:
         """Calculate maximum friction force: F_max = μN"""
-        return self.friction_coefficient * self.normal_force()
+        return self._max_friction_force
+    
+    def max_lateral_acceleration(self) -> float:
+        """Calculate maximum lateral acceleration before slipping: a_max = μg"""
+        return self._max_lateral_acceleration
+
+
+_PARAMETER_FIELDS = frozenset(f.name for f in fields(PhysicsParameters))
 
 
 class PIDController:
-    """PID controller for steering angle tracking with anti-windup"""
+    """
+    PID controller for steering angle tracking with anti-windup.
+    
+    `compute` starts as the first-call variant, which uses a default dt, and rebinds itself
+    to the steady-state variant so later steps skip the first-call branch.
+    """
     
     def __init__(self, kp: float = 0.5, ki: float = 0.1, kd: float = 0.2, 
                  integral_limit: float = 100.0, output_limit: float = 500.0):
@@ -123,8 +203,9 @@ class PIDController:
         self.prev_error = 0.0
         self.prev_time = 0.0
         self.first_call = True
+        self.compute = self._compute_first
     
-    def compute(self, target: float, current: float, time: float) -> float:
+    def _compute_first(self, target: float, current: float, time: float) -> float:
         """
         Compute PID control signal
         
@@ -136,37 +217,27 @@ class PIDController:
         Returns:
             Control signal (degrees/second)
         """
-        error = target - current
-        
-        # Calculate time step
-        if self.first_call:
-            dt = 0.01  # Default dt for first call
-            self.first_call = False
-        else:
-            dt = time - self.prev_time
-            if dt <= 0:
-                # Prevent division by zero or negative dt
-                warnings.warn(f"Invalid time step: {dt}, using 0.01")
-                dt = 0.01
-        
+        self._mark_started()
+        return self._update(target - current, 0.01, time)  # Default dt for first call
+    
+    def _compute_steady(self, target: float, current: float, time: float) -> float:
+        """Compute PID control signal after the first call; time must increase between calls"""
+        return self._update(target - current, time - self.prev_time, time)
+    
+    def _update(self, error: float, dt: float, time: float) -> float:
         # Proportional term
         p_term = self.kp * error
         
         # Integral term with anti-windup
-        self.integral += error * dt
-        self.integral = np.clip(self.integral, -self.integral_limit, self.integral_limit)
+        self.integral = min(max(self.integral + error * dt, -self.integral_limit), self.integral_limit)
         i_term = self.ki * self.integral
         
-        # Derivative term with derivative kick prevention
-        if dt > 0:
-            derivative = (error - self.prev_error) / dt
-        else:
-            derivative = 0.0
-        d_term = self.kd * derivative
+        # Derivative term
+        d_term = self.kd * ((error - self.prev_error) / dt)
         
         # Compute output with saturation
         output = p_term + i_term + d_term
-        output = np.clip(output, -self.output_limit, self.output_limit)
+        output = min(max(output, -self.output_limit), self.output_limit)
         
         # Update state
         self.prev_error = error
@@ -174,12 +245,28 @@ class PIDController:
         
         return output
     
+    def _mark_started(self):
+        """Switch to the steady-state compute path"""
+        self.first_call = False
+        self.compute = self._compute_steady
+    
     def reset(self):
         """Reset controller state"""
         self.integral = 0.0
         self.prev_error = 0.0
         self.prev_time = 0.0
         self.first_call = True
+        self.compute = self._compute_first
+    
+    def __getstate__(self) -> Dict:
+        # The bound compute method is rebuilt from first_call on load
+        state = self.__dict__.copy()
+        state.pop('compute', None)
+        return state
+    
+    def __setstate__(self, state: Dict):
+        self.__dict__.update(state)
+        self.compute = self._compute_first if self.first_call else self._compute_steady
     
     def set_gains(self, kp: float, ki: float, kd: float):
         """Update PID gains"""
@@ -188,6 +275,236 @@ class PIDController:
         self.kd = kd
 
 
+@njit(cache=True)
+def _integrate_kernel(time, x, y, velocity, heading, steering_angle, dt, steering_input,
+                      mass, mu_g, max_friction_force, wheelbase, max_steering_angle, eps):
+    """
+    One integration step of the bicycle model on plain floats (see VehicleDynamics.integrate).
+    Inlines calculate_turn_radius and check_slip_condition so it compiles to a single
+    function under numba.
+    
+    Returns:
+        ((time, x, y, velocity, heading, steering_angle, angular_velocity) in HISTORY_FIELDS
+        order, (turn_radius, centripetal_force) of the new state, inf / 0.0 when straight)
+    """
+    # Update steering angle with rate limiting and saturation
+    new_steering = min(max(steering_angle + steering_input * dt, -max_steering_angle),
+                       max_steering_angle)
+    
+    # Turn radius R = L / tan(δ); straight motion when δ or tan(δ) is ~0
+    turning = False
+    turn_radius = math.inf
+    angle_rad = math.radians(new_steering)
+    if abs(angle_rad) >= eps:
+        tan_angle = math.tan(angle_rad)
+        if abs(tan_angle) >= eps:
+            turn_radius = wheelbase / tan_angle
+            turning = abs(turn_radius) > eps
+    
+    # Calculate angular velocity based on slip condition
+    angular_velocity = 0.0
+    required_force = 0.0
+    if turning:
+        required_force = (mass * velocity ** 2) / turn_radius
+        if max_friction_force < eps:
+            can_turn = required_force < eps
+        else:
+            can_turn = required_force <= max_friction_force
+        
+        if can_turn:
+            # No slip: use kinematic relationship ω = v/R
+            angular_velocity = velocity / turn_radius
+        elif velocity > eps:
+            # Slipping: ω_max = a_max / v = μg / v, in the direction of steering
+            angular_velocity = math.copysign(mu_g / velocity, new_steering)
+    
+    # Update heading and position using RK4 integration
+    k1_heading = angular_velocity
+    k1_x = velocity * math.cos(heading)
+    k1_y = velocity * math.sin(heading)
+
+    k2_heading = angular_velocity
+    k2_x = velocity * math.cos(heading + 0.5 * k1_heading * dt)
+    k2_y = velocity * math.sin(heading + 0.5 * k1_heading * dt)
+
+    k3_heading = angular_velocity
+    k3_x = velocity * math.cos(heading + 0.5 * k2_heading * dt)
+    k3_y = velocity * math.sin(heading + 0.5 * k2_heading * dt)
+
+    k4_heading = angular_velocity
+    k4_x = velocity * math.cos(heading + k3_heading * dt)
+    k4_y = velocity * math.sin(heading + k3_heading * dt)
+
+    new_heading = heading + (dt / 6.0) * (k1_heading + 2*k2_heading + 2*k3_heading + k4_heading)
+    new_x = x + (dt / 6.0) * (k1_x + 2*k2_x + 2*k3_x + k4_x)
+    new_y = y + (dt / 6.0) * (k1_y + 2*k2_y + 2*k3_y + k4_y)
+
+    # Normalize heading to [-π, π]; headings already in range are left untouched
+    if new_heading > math.pi or new_heading < -math.pi:
+        new_heading = (new_heading + math.pi) % (2.0 * math.pi) - math.pi
+    
+    return ((time + dt, new_x, new_y, velocity, new_heading, new_steering, angular_velocity),
+            (turn_radius, required_force))
+
+
+@njit(cache=True)
+def _simulate_kernel(buffer, start, steps, controls, integrals,
+                     time, x, y, velocity, heading, steering_angle, dt, target,
+                     kp, ki, kd, integral_limit, output_limit,
+                     integral, prev_error, prev_time, first_call,
+                     mass, mu_g, max_friction_force, wheelbase, max_steering_angle, eps):
+    """
+    Run `steps` fused PID + dynamics steps without returning to Python in between.
+    History is written to buffer columns start..start+steps (HISTORY_FIELDS order), and each
+    step's control signal and PID integral to controls[i] / integrals[i].
+    
+    Returns:
+        Controller state (integral, prev_error, prev_time) after the last step
+    """
+    # The first-call default dt is resolved before the loop, so the body is branch-free
+    pid_dt = 0.01 if first_call else time - prev_time
+    start_time = time
+    for i in range(steps):
+        # PID control with anti-windup (mirrors PIDController.compute)
+        error = target - steering_angle
+        integral = min(max(integral + error * pid_dt, -integral_limit), integral_limit)
+        derivative = (error - prev_error) / pid_dt
+        control = kp * error + ki * integral + kd * derivative
+        control = min(max(control, -output_limit), output_limit)
+        prev_error = error
+        prev_time = time
+        
+        row, _ = _integrate_kernel(
+            time, x, y, velocity, heading, steering_angle, dt, control,
+            mass, mu_g, max_friction_force, wheelbase, max_steering_angle, eps
+        )
+        _, x, y, velocity, heading, steering_angle, angular_velocity = row
+        # Time from the step index rather than accumulated, which would drift over long runs
+        time = start_time + (i + 1) * dt
+        pid_dt = time - prev_time
+        
+        col = start + i
+        buffer[0, col] = time
+        buffer[1, col] = x
+        buffer[2, col] = y
+        buffer[3, col] = velocity
+        buffer[4, col] = heading
+        buffer[5, col] = steering_angle
+        buffer[6, col] = angular_velocity
+        controls[i] = control
+        integrals[i] = integral
+    
+    return integral, prev_error, prev_time
+
+
+# Per-trajectory columns of the run_batch() configuration matrix
+BATCH_CONFIG_FIELDS = (
+    'initial_velocity', 'target_angle', 'kp', 'ki', 'kd', 'integral_limit', 'output_limit',
+    'mass', 'max_lateral_acceleration', 'max_friction_force', 'wheelbase', 'max_steering_angle'
+)
+
+
+@njit(parallel=True, cache=True)
+def _simulate_batch_kernel(out, steps, config, dt, eps):
+    """
+    Run config.shape[0] independent trajectories of `steps` steps from rest at the origin,
+    spread across threads with prange. Trajectory k is written to out[k] in HISTORY_FIELDS order.
+    """
+    for k in prange(config.shape[0]):
+        c = config[k]
+        controls = np.empty(steps)
+        integrals = np.empty(steps)
+        _simulate_kernel(out[k], 0, steps, controls, integrals,
+                         0.0, 0.0, 0.0, c[0], 0.0, 0.0, dt, c[1],
+                         c[2], c[3], c[4], c[5], c[6],
+                         0.0, 0.0, 0.0, True,
+                         c[7], c[8], c[9], c[10], c[11], eps)
+
+
+_kernels_warm = False
+
+
+def warm_up_kernels():
+    """
+    Trigger JIT compilation (or load it from cache) so the first simulation step is not slowed
+    by it. Only the first call does any work, so it is cheap to call from Simulation.__init__.
+    """
+    global _kernels_warm
+    if _kernels_warm:
+        return
+    _integrate_kernel(0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.01, 1.0,
+                      1.0, 6.867, 6.867, 2.5, 45.0, 1e-8)
+    _simulate_kernel(np.empty((7, 1)), 0, 1, np.empty(1), np.empty(1),
+                     0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.01, 1.0,
+                     0.5, 0.1, 0.2, 100.0, 500.0,
+                     0.0, 0.0, 0.0, True,
+                     1.0, 6.867, 6.867, 2.5, 45.0, 1e-8)
+    _kernels_warm = True
+
+
+def turn_radius_vec(steering_angle_deg, wheelbase: float, eps: float = 1e-8) -> np.ndarray:
+    """
+    Branchless bicycle-model turn radius R = L / tan(δ) for scalars or arrays
+    
+    Returns:
+        Turn radius in meters, inf where δ or tan(δ) is ~0 (straight motion)
+    """
+    angle_rad = np.radians(steering_angle_deg)
+    tan_angle = np.tan(angle_rad)
+    straight = (np.abs(angle_rad) < eps) | (np.abs(tan_angle) < eps)
+    return np.where(straight, np.inf, wheelbase / np.where(straight, 1.0, tan_angle))
+
+
+def centripetal_force_vec(velocity, turn_radius, mass: float, eps: float = 1e-8) -> np.ndarray:
+    """Branchless required centripetal force F_c = mv²/R, zero for straight motion"""
+    curving = np.isfinite(turn_radius) & (np.abs(turn_radius) >= eps)
+    return np.where(curving, (mass * velocity ** 2) / np.where(curving, turn_radius, 1.0), 0.0)
+
+
+def slip_condition_vec(required_force, max_force: float, eps: float = 1e-8) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Branchless slip check against the available friction force
+    
+    Returns:
+        Tuple of (can_turn_without_slip, friction_utilization_percent)
+    """
+    if max_force < eps:
+        # No friction available: only force-free motion avoids slipping
+        can_turn = required_force < eps
+        return can_turn, np.where(can_turn, 0.0, 100.0)
+    return required_force <= max_force, np.minimum((required_force / max_force) * 100.0, 100.0)
+
+
+def max_safe_velocity_vec(turn_radius, mu_g: float, max_friction_force: float) -> np.ndarray:
+    """Branchless maximum non-slipping velocity v_max = sqrt(μgR), inf for straight motion"""
+    straight = ~np.isfinite(turn_radius)
+    if max_friction_force <= 0:
+        return np.where(straight, np.inf, 0.0)
+    return np.where(straight, np.inf,
+                    np.sqrt(mu_g * np.abs(np.where(straight, 0.0, turn_radius))))
+
+
+def _max_safe_velocity_kernel(steering_angle_deg, wheelbase, max_lateral_acceleration,
+                              max_friction_force, eps):
+    """Scalar v_max = sqrt(μgR) on plain floats, same cases as VehicleDynamics.calculate_max_safe_velocity"""
+    angle_rad = math.radians(steering_angle_deg)
+    if abs(angle_rad) < eps:
+        return math.inf
+    tan_angle = math.tan(angle_rad)
+    if abs(tan_angle) < eps:
+        return math.inf
+    if max_friction_force <= 0:
+        return 0.0
+    return math.sqrt(max_lateral_acceleration * abs(wheelbase / tan_angle))
+
+
+@lru_cache(maxsize=None)
+def _max_safe_velocity_ufunc():
+    """Multi-threaded numba ufunc for _max_safe_velocity_kernel, compiled on first use"""
+    return vectorize(['float64(float64, float64, float64, float64, float64)'],
+                     target='parallel', cache=True)(_max_safe_velocity_kernel)
+
+
 class VehicleDynamics:
     """Physics engine for vehicle dynamics simulation using bicycle model"""
     
@@ -206,15 +523,15 @@ class VehicleDynamics:
         Returns:
             Turn radius in meters (inf for straight motion)
         """
-        angle_rad = np.radians(steering_angle_deg)
+        angle_rad = math.radians(steering_angle_deg)
         
         # Use epsilon to prevent division issues
         if abs(angle_rad) < self._epsilon:
-            return np.inf
+            return math.inf
         
-        tan_angle = np.tan(angle_rad)
+        tan_angle = math.tan(angle_rad)
         if abs(tan_angle) < self._epsilon:
-            return np.inf
+            return math.inf
             
         return self.params.wheelbase / tan_angle
     
@@ -230,7 +547,7 @@ class VehicleDynamics:
         Returns:
             Required centripetal force (N)
         """
-        if not np.isfinite(turn_radius) or abs(turn_radius) < self._epsilon:
+        if not math.isfinite(turn_radius) or abs(turn_radius) < self._epsilon:
             return 0.0
         
         return (self.params.mass * velocity ** 2) / turn_radius
@@ -246,20 +563,29 @@ class VehicleDynamics:
         Returns:
             Maximum safe velocity (m/s)
         """
-        turn_radius = self.calculate_turn_radius(steering_angle_deg)
-        
-        if not np.isfinite(turn_radius):
-            return np.inf
-        
-        max_friction = self.params.max_friction_force()
-        if max_friction <= 0:
-            return 0.0
+        return _max_safe_velocity_kernel(steering_angle_deg, self.params.wheelbase,
+                                         self.params.max_lateral_acceleration(),
+                                         self.params.max_friction_force(), self._epsilon)
+    
+    def calculate_max_safe_velocity_batch(self, steering_angles_deg) -> np.ndarray:
+        """
+        Maximum safe velocity for many steering angles at once (e.g. envelope plots).
+        Uses a parallel numba ufunc when numba is installed, NumPy otherwise.
         
-        # v_max = sqrt((μmg * r) / m) = sqrt(μgr)
-        max_velocity = np.sqrt(self.params.friction_coefficient * 
-                              self.params.gravity * abs(turn_radius))
+        Args:
+            steering_angles_deg: Array of steering angles (degrees)
         
-        return max_velocity
+        Returns:
+            Array of maximum safe velocities (m/s), inf for straight motion
+        """
+        angles = np.asarray(steering_angles_deg, dtype=np.float64)
+        params = self.params
+        if vectorize is not None:
+            return _max_safe_velocity_ufunc()(angles, params.wheelbase, params.max_lateral_acceleration(),
+                                              params.max_friction_force(), self._epsilon)
+        turn_radius = turn_radius_vec(angles, params.wheelbase, self._epsilon)
+        return max_safe_velocity_vec(turn_radius, params.max_lateral_acceleration(),
+                                     params.max_friction_force())
     
     def check_slip_condition(self, velocity: float, steering_angle_deg: float) -> Tuple[bool, float]:
         """
@@ -300,77 +626,138 @@ class VehicleDynamics:
         Returns:
             New vehicle state
         """
+        time, x, y, velocity, heading, steering_angle, angular_velocity = self.integrate(
+            state.time, state.pos_x, state.pos_y, state.velocity,
+            state.heading, state.steering_angle, dt, steering_input
+        )
+        return VehicleState(
+            time=time,
+            position=(x, y),
+            velocity=velocity,
+            heading=heading,
+            steering_angle=steering_angle,
+            angular_velocity=angular_velocity
+        )
+    
+    def integrate(self, time: float, x: float, y: float, velocity: float, heading: float,
+                  steering_angle: float, dt: float, steering_input: float) -> Tuple[float, ...]:
+        """
+        Advance raw state values by one time step without allocating a VehicleState
+        
+        Returns:
+            (time, x, y, velocity, heading, steering_angle, angular_velocity),
+            in HISTORY_FIELDS order
+        """
+        return self._integrate(time, x, y, velocity, heading, steering_angle, dt, steering_input)[0]
+    
+    def integrate_with_diagnostics(self, time: float, x: float, y: float, velocity: float,
+                                   heading: float, steering_angle: float, dt: float,
+                                   steering_input: float) -> Tuple[Tuple[float, ...], Tuple]:
+        """
+        integrate() plus the slip diagnostics of the new state. The turn radius and centripetal
+        force are taken from the integration step instead of being recomputed.
+        
+        Returns:
+            (row in HISTORY_FIELDS order, diagnostics in STEP_DIAGNOSTIC_FIELDS order);
+            turn_radius and max_safe_velocity are inf for straight-line motion
+        """
+        row, (turn_radius, centripetal_force) = self._integrate(
+            time, x, y, velocity, heading, steering_angle, dt, steering_input
+        )
+        
+        # Same cases as check_slip_condition / calculate_max_safe_velocity
+        max_force = self.params.max_friction_force()
+        if max_force < self._epsilon:
+            can_turn = centripetal_force < self._epsilon
+            friction_utilization = 0.0 if can_turn else 100.0
+        else:
+            can_turn = centripetal_force <= max_force
+            friction_utilization = min((centripetal_force / max_force) * 100.0, 100.0)
+        
+        if not math.isfinite(turn_radius):
+            max_safe_velocity = math.inf
+        elif max_force <= 0:
+            max_safe_velocity = 0.0
+        else:
+            max_safe_velocity = math.sqrt(self.params.max_lateral_acceleration() * abs(turn_radius))
+        
+        return row, (turn_radius, centripetal_force, can_turn, friction_utilization, max_safe_velocity)
+    
+    def _integrate(self, time, x, y, velocity, heading, steering_angle, dt, steering_input):
         # Validate inputs
         if dt <= 0:
             raise ValueError(f"Time step must be positive, got {dt}")
         
-        # Update steering angle with rate limiting and saturation
-        new_steering = state.steering_angle + steering_input * dt
-        new_steering = np.clip(new_steering, 
-                              -self.params.max_steering_angle, 
-                              self.params.max_steering_angle)
-        
-        # Calculate turn radius and check slip
-        turn_radius = self.calculate_turn_radius(new_steering)
-        can_turn, friction_util = self.check_slip_condition(state.velocity, new_steering)
-        
-        # Calculate angular velocity based on slip condition
-        if np.isfinite(turn_radius) and abs(turn_radius) > self._epsilon:
-            if can_turn:
-                # No slip: use kinematic relationship ω = v/R
-                angular_velocity = state.velocity / turn_radius
-            else:
-                # Slipping: limited by maximum friction force
-                # Maximum lateral acceleration: a_max = μg
-                # ω_max = a_max / v = μg / v
-                if state.velocity > self._epsilon:
-                    max_angular_vel = (self.params.friction_coefficient * 
-                                     self.params.gravity) / state.velocity
-                    # Apply direction based on steering
-                    angular_velocity = max_angular_vel * np.sign(new_steering)
-                else:
-                    angular_velocity = 0.0
-        else:
-            # Straight line motion
-            angular_velocity = 0.0
-        
-        # Update heading and position using RK4 integration
-        k1_heading = angular_velocity
-        k1_x = state.velocity * np.cos(state.heading)
-        k1_y = state.velocity * np.sin(state.heading)
+        params = self.params
+        return _integrate_kernel(
+            float(time), float(x), float(y), float(velocity), float(heading),
+            float(steering_angle), float(dt), float(steering_input),
+            float(params.mass), float(params.max_lateral_acceleration()),
+            float(params.max_friction_force()),
+            float(params.wheelbase), float(params.max_steering_angle), self._epsilon
+        )
 
-        k2_heading = angular_velocity
-        k2_x = state.velocity * np.cos(state.heading + 0.5 * k1_heading * dt)
-        k2_y = state.velocity * np.sin(state.heading + 0.5 * k1_heading * dt)
 
-        k3_heading = angular_velocity
-        k3_x = state.velocity * np.cos(state.heading + 0.5 * k2_heading * dt)
-        k3_y = state.velocity * np.sin(state.heading + 0.5 * k2_heading * dt)
+# Column layout of simulation history (raw SI units, angles as stored in VehicleState)
+HISTORY_FIELDS = (
+    'time', 'position_x', 'position_y', 'velocity',
+    'heading_rad', 'steering_angle', 'angular_velocity_rad'
+)
+HISTORY_DTYPE = np.dtype([(name, np.float64) for name in HISTORY_FIELDS])
 
-        k4_heading = angular_velocity
-        k4_x = state.velocity * np.cos(state.heading + k3_heading * dt)
-        k4_y = state.velocity * np.sin(state.heading + k3_heading * dt)
+# Order of the per-step diagnostics tuple from VehicleDynamics.integrate_with_diagnostics
+STEP_DIAGNOSTIC_FIELDS = (
+    'turn_radius', 'centripetal_force_required', 'can_turn',
+    'friction_utilization', 'max_safe_velocity'
+)
 
-        new_heading = state.heading + (dt / 6.0) * (k1_heading + 2*k2_heading + 2*k3_heading + k4_heading)
-        new_x = state.position[0] + (dt / 6.0) * (k1_x + 2*k2_x + 2*k3_x + k4_x)
-        new_y = state.position[1] + (dt / 6.0) * (k1_y + 2*k2_y + 2*k3_y + k4_y)
 
-        # Normalize heading to [-π, π]
-        new_heading = np.arctan2(np.sin(new_heading), np.cos(new_heading))
-        
+class SimulationHistory(Sequence):
+    """
+    Read-only view over the first n columns of a (len(HISTORY_FIELDS), capacity) buffer.
+    VehicleState objects are only built when an entry is accessed.
+    """
+    
+    __slots__ = ('_buffer', '_n')
+    
+    def __init__(self, buffer: np.ndarray, n: int):
+        self._buffer = buffer
+        self._n = n
+    
+    def __len__(self) -> int:
+        return self._n
+    
+    def _state_at(self, index: int) -> VehicleState:
+        time, x, y, velocity, heading, steering_angle, angular_velocity = self._buffer[:, index].tolist()
         return VehicleState(
-            time=state.time + dt,
-            position=np.array([new_x, new_y], dtype=np.float64),
-            velocity=state.velocity,
-            heading=new_heading,
-            steering_angle=new_steering,
+            time=time,
+            position=(x, y),
+            velocity=velocity,
+            heading=heading,
+            steering_angle=steering_angle,
             angular_velocity=angular_velocity
         )
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._state_at(i) for i in range(*index.indices(self._n))]
+        if index < 0:
+            index += self._n
+        if not 0 <= index < self._n:
+            raise IndexError("history index out of range")
+        return self._state_at(index)
+    
+    def __iter__(self) -> Iterator[VehicleState]:
+        for i in range(self._n):
+            yield self._state_at(i)
 
 
 class Simulation:
     """Main simulation controller with enhanced diagnostic and error handling"""
     
+    INITIAL_CAPACITY = 256  # History entries preallocated for a new simulation
+    STREAM_CHUNK_STEPS = 256  # Steps simulated per batch by run_iter()
+    
     def __init__(self, params: PhysicsParameters, controller: PIDController,
                  initial_velocity: float = 10.0, dt: float = 0.01):
         """
@@ -389,6 +776,8 @@ class Simulation:
         if initial_velocity < 0:
             raise ValueError(f"Initial velocity must be non-negative, got {initial_velocity}")
         
+        warm_up_kernels()
+        
         self.params = params
         self.controller = controller
         self.dynamics = VehicleDynamics(params)
@@ -398,7 +787,7 @@ class Simulation:
         # Initialize state
         self.state = VehicleState(
             time=0.0,
-            position=np.array([0.0, 0.0], dtype=np.float64),
+            position=(0.0, 0.0),
             velocity=initial_velocity,
             heading=0.0,
             steering_angle=0.0,
@@ -406,8 +795,11 @@ class Simulation:
         )
         
         self.target_angle = 0.0
-        self.history: List[VehicleState] = []
+        # History columns in HISTORY_FIELDS order; only the first _n columns are valid
+        self._buffer = np.empty((len(HISTORY_FIELDS), self.INITIAL_CAPACITY), dtype=np.float64)
+        self._n = 0
         self.current_time = 0.0  # Track current simulation time
+        self.revision = 0  # Incremented on every change to state, history or parameters
     
     def step(self) -> Dict:
         """
@@ -416,44 +808,148 @@ class Simulation:
         Returns:
             Dictionary with current state and diagnostics
         """
-        # Compute control signal
         control_signal = self.controller.compute(
             self.target_angle, 
             self.state.steering_angle, 
             self.state.time
         )
         
-        # Update physics
-        self.state = self.dynamics.update_state(self.state, self.dt, control_signal)
-        self.current_time = self.state.time
+        # Update physics; diagnostics reuse the turn radius and force from the integration step
+        state = self.state
+        row, diagnostics = self.dynamics.integrate_with_diagnostics(
+            state.time, state.pos_x, state.pos_y, state.velocity,
+            state.heading, state.steering_angle, self.dt, control_signal
+        )
+        self._record(row)
         
-        # Store history (deep copy to prevent reference issues)
-        self.history.append(self.state.copy())
+        return self._step_dict(row, diagnostics, control_signal, self.controller.integral,
+                               float(self.params.normal_force()), float(self.params.max_friction_force()))
+    
+    def advance(self) -> float:
+        """
+        Execute one simulation step without building the state/diagnostics dictionary
         
-        # Calculate diagnostics
-        can_turn, friction_util = self.dynamics.check_slip_condition(
-            self.state.velocity, 
-            self.state.steering_angle
+        Returns:
+            Control signal applied during the step (deg/s)
+        """
+        # Compute control signal
+        control_signal = self.controller.compute(
+            self.target_angle, 
+            self.state.steering_angle, 
+            self.state.time
         )
         
-        turn_radius = self.dynamics.calculate_turn_radius(self.state.steering_angle)
-        centripetal_force = self.dynamics.calculate_centripetal_force(
-            self.state.velocity, turn_radius
+        # Update physics
+        state = self.state
+        row = self.dynamics.integrate(
+            state.time, state.pos_x, state.pos_y, state.velocity,
+            state.heading, state.steering_angle, self.dt, control_signal
         )
-        max_safe_vel = self.dynamics.calculate_max_safe_velocity(self.state.steering_angle)
+        self._record(row)
+        
+        return control_signal
+    
+    def _record(self, row: Tuple[float, ...]):
+        """Make an integrated row (HISTORY_FIELDS order) the current state and append it to history"""
+        state = self.state
+        (state.time, state.pos_x, state.pos_y, state.velocity,
+         state.heading, state.steering_angle, state.angular_velocity) = row
+        self.current_time = state.time
+        self.revision += 1
+        
+        # Store history as one column of the SoA buffer
+        if self._n == self._buffer.shape[1]:
+            self.reserve(1)
+        self._buffer[:, self._n] = row
+        self._n += 1
+    
+    def compute_diagnostics(self, start: int = 0, stop: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Vectorized slip/force diagnostics for history entries [start, stop)
+        
+        Returns:
+            Arrays keyed like step()['diagnostics'], without the controller-internal
+            'pid_integral' and 'control_signal'; turn_radius and max_safe_velocity are
+            inf for straight-line motion
+        """
+        stop = self._n if stop is None else stop
+        return self._diagnostics_at(slice(start, stop))
+    
+    def _diagnostics_at(self, columns) -> Dict[str, np.ndarray]:
+        """compute_diagnostics for the history entries selected by a slice or index array"""
+        velocity = self._buffer[3, columns]
+        steering = self._buffer[5, columns]
+        params = self.params
+        eps = self.dynamics._epsilon
+        max_force = params.max_friction_force()
+        
+        turn_radius = turn_radius_vec(steering, params.wheelbase, eps)
+        centripetal_force = centripetal_force_vec(velocity, turn_radius, params.mass, eps)
+        can_turn, friction_utilization = slip_condition_vec(centripetal_force, max_force, eps)
+        max_safe_velocity = max_safe_velocity_vec(turn_radius, params.max_lateral_acceleration(),
+                                                  max_force)
         
         return {
-            'state': self.state.to_dict(),
+            'can_turn': can_turn,
+            'friction_utilization': friction_utilization,
+            'turn_radius': turn_radius,
+            'normal_force': np.full(len(steering), params.normal_force()),
+            'max_friction_force': np.full(len(steering), max_force),
+            'centripetal_force_required': centripetal_force,
+            'max_safe_velocity': max_safe_velocity,
+            'pid_error': self.target_angle - steering
+        }
+    
+    def _step_results(self, start: int, controls, integrals) -> List[Dict]:
+        """Build the per-step state and diagnostics dictionaries for history entries from start onwards"""
+        return self._step_results_at(slice(start, start + len(controls)), controls, integrals)
+    
+    def _step_results_at(self, columns, controls, integrals) -> List[Dict]:
+        """
+        Build the per-step dictionaries for the history entries selected by a slice or index
+        array; controls and integrals hold one value per selected entry
+        """
+        diagnostics = self._diagnostics_at(columns)
+        rows = zip(*self._buffer[:, columns].tolist())
+        step_diagnostics = zip(*(diagnostics[name].tolist() for name in STEP_DIAGNOSTIC_FIELDS))
+        normal_force = float(self.params.normal_force())
+        max_friction_force = float(self.params.max_friction_force())
+        
+        return [
+            self._step_dict(row, step_diag, control_signal, pid_integral,
+                            normal_force, max_friction_force)
+            for row, step_diag, control_signal, pid_integral in zip(
+                rows, step_diagnostics, controls, integrals
+            )
+        ]
+    
+    def _step_dict(self, row, diagnostics, control_signal, pid_integral,
+                   normal_force, max_friction_force) -> Dict:
+        """State and diagnostics dictionary for one history row and its STEP_DIAGNOSTIC_FIELDS tuple"""
+        time, x, y, velocity, heading, steering_angle, angular_velocity = row
+        turn_radius, centripetal_force, can_turn, friction_utilization, max_safe_velocity = diagnostics
+        return {
+            'state': {
+                'time': time,
+                'position_x': x,
+                'position_y': y,
+                'velocity': velocity,
+                'heading_deg': math.degrees(heading),
+                'heading_rad': heading,
+                'steering_angle': steering_angle,
+                'angular_velocity_rad': angular_velocity,
+                'angular_velocity_deg': math.degrees(angular_velocity)
+            },
             'diagnostics': {
-                'can_turn': bool(can_turn),
-                'friction_utilization': float(friction_util),
-                'turn_radius': float(turn_radius) if np.isfinite(turn_radius) else None,
-                'normal_force': float(self.params.normal_force()),
-                'max_friction_force': float(self.params.max_friction_force()),
-                'centripetal_force_required': float(centripetal_force),
-                'max_safe_velocity': float(max_safe_vel) if np.isfinite(max_safe_vel) else None,
-                'pid_error': float(self.target_angle - self.state.steering_angle),
-                'pid_integral': float(self.controller.integral),
+                'can_turn': can_turn,
+                'friction_utilization': friction_utilization,
+                'turn_radius': turn_radius if math.isfinite(turn_radius) else None,
+                'normal_force': normal_force,
+                'max_friction_force': max_friction_force,
+                'centripetal_force_required': centripetal_force,
+                'max_safe_velocity': max_safe_velocity if math.isfinite(max_safe_velocity) else None,
+                'pid_error': self.target_angle - steering_angle,
+                'pid_integral': float(pid_integral),
                 'control_signal': float(control_signal)
             }
         }
@@ -469,25 +965,236 @@ class Simulation:
         Returns:
             List of state dictionaries
         """
+        steps = self._prepare_run(duration, target_angle)
+        start, controls, integrals = self._simulate_steps(steps)
+        return self._step_results(start, controls.tolist(), integrals.tolist())
+    
+    def run_sampled(self, duration: float, target_angle: float,
+                    max_points: int) -> Tuple[List[Dict], int]:
+        """
+        Run simulation for specified duration, building state dictionaries only for
+        at most max_points evenly spaced steps (always including the first and last)
+        
+        Args:
+            duration: Simulation duration (seconds)
+            target_angle: Target steering angle (degrees)
+            max_points: Maximum number of steps to return (at least 2)
+        
+        Returns:
+            (state dictionaries of the sampled steps, total number of steps simulated)
+        """
+        if max_points < 2:
+            raise ValueError(f"max_points must be at least 2, got {max_points}")
+        
+        steps = self._prepare_run(duration, target_angle)
+        start, controls, integrals = self._simulate_steps(steps)
+        if steps <= max_points:
+            return self._step_results(start, controls.tolist(), integrals.tolist()), steps
+        
+        idx = np.linspace(0, steps - 1, max_points).astype(np.int64)
+        return self._step_results_at(start + idx, controls[idx].tolist(),
+                                     integrals[idx].tolist()), steps
+    
+    def simulate(self, duration: float, target_angle: float) -> Dict[str, np.ndarray]:
+        """
+        Run simulation for specified duration in one fused loop, without per-step dictionaries
+        
+        Args:
+            duration: Simulation duration (seconds)
+            target_angle: Target steering angle (degrees)
+        
+        Returns:
+            History columns (HISTORY_FIELDS) of the steps just simulated
+        """
+        start, _, _ = self._simulate_steps(self._prepare_run(duration, target_angle))
+        return {name: self._buffer[i, start:self._n].copy() for i, name in enumerate(HISTORY_FIELDS)}
+    
+    def _prepare_run(self, duration: float, target_angle: float) -> int:
+        """Validate run arguments, set the target and reserve history; returns the step count"""
         if duration <= 0:
             raise ValueError(f"Duration must be positive, got {duration}")
         if not -90 <= target_angle <= 90:
             warnings.warn(f"Target angle {target_angle}° is outside typical range [-90, 90]")
         
         self.target_angle = target_angle
-        results = []
         
-        steps = int(np.ceil(duration / self.dt))
+        steps = self._steps_for(duration)
+        self.reserve(steps)
+        return steps
+    
+    def _steps_for(self, duration: float) -> int:
+        """Number of steps covering duration: the smallest n with n * dt >= duration"""
+        steps = math.ceil(duration / self.dt)
+        # duration / dt can round up past an exact multiple (0.07 / 0.01 -> 7.000000000000001)
+        if steps > 0 and (steps - 1) * self.dt >= duration:
+            steps -= 1
+        return steps
+    
+    def _simulate_steps(self, steps: int) -> Tuple[int, np.ndarray, np.ndarray]:
+        """
+        Fused simulation loop shared by run(), run_iter() and simulate().
+        History capacity for the steps must already be reserved (see _prepare_run).
+        
+        Returns:
+            (index of the first new history entry, per-step control signals, per-step PID integrals)
+        """
+        start = self._n
+        controls = np.empty(steps, dtype=np.float64)
+        integrals = np.empty(steps, dtype=np.float64)
+        if steps == 0:
+            return start, controls, integrals
+        
+        state, params, controller = self.state, self.params, self.controller
+        controller.integral, controller.prev_error, controller.prev_time = _simulate_kernel(
+            self._buffer, start, steps, controls, integrals,
+            float(state.time), float(state.pos_x), float(state.pos_y),
+            float(state.velocity), float(state.heading), float(state.steering_angle),
+            float(self.dt), float(self.target_angle),
+            float(controller.kp), float(controller.ki), float(controller.kd),
+            float(controller.integral_limit), float(controller.output_limit),
+            float(controller.integral), float(controller.prev_error), float(controller.prev_time),
+            bool(controller.first_call),
+            float(params.mass), float(params.max_lateral_acceleration()),
+            float(params.max_friction_force()),
+            float(params.wheelbase), float(params.max_steering_angle), self.dynamics._epsilon
+        )
+        controller._mark_started()
+        
+        self._n = start + steps
+        (state.time, state.pos_x, state.pos_y, state.velocity,
+         state.heading, state.steering_angle, state.angular_velocity) = self._buffer[:, self._n - 1].tolist()
+        self.current_time = state.time
+        self.revision += steps
+        return start, controls, integrals
+    
+    def run_iter(self, duration: float, target_angle: float) -> Iterator[Dict]:
+        """
+        Run simulation for specified duration, yielding each step's result
+        (steps are computed STREAM_CHUNK_STEPS at a time)
+        
+        Args:
+            duration: Simulation duration (seconds)
+            target_angle: Target steering angle (degrees)
+        
+        Returns:
+            Iterator over the state dictionary of each step; the arguments are validated
+            when run_iter is called, before any step is simulated
+        """
+        return self._iter_steps(self._prepare_run(duration, target_angle))
+    
+    def _iter_steps(self, steps: int) -> Iterator[Dict]:
+        """Simulate an already-reserved number of steps, yielding each step's result"""
+        # Simulate in fused chunks so no per-step arrays are allocated while streaming
+        for offset in range(0, steps, self.STREAM_CHUNK_STEPS):
+            start, controls, integrals = self._simulate_steps(min(self.STREAM_CHUNK_STEPS, steps - offset))
+            yield from self._step_results(start, controls.tolist(), integrals.tolist())
+    
+    def clone_with(self, overrides: Dict) -> 'Simulation':
+        """
+        Create a fresh simulation with this one's configuration and selected values overridden.
+        Only configuration is copied; the clone starts from the initial state with empty history.
+        
+        Args:
+            overrides: Mapping of PhysicsParameters field names, 'initial_velocity', 'dt',
+                       'kp'/'ki'/'kd' or 'pid_gains' (dict of gains) to new values
+        
+        Returns:
+            New Simulation instance
+        """
+        param_names = {f.name for f in fields(PhysicsParameters)}
+        param_updates = {}
+        gains = {'kp': self.controller.kp, 'ki': self.controller.ki, 'kd': self.controller.kd}
+        initial_velocity = self.initial_velocity
+        dt = self.dt
+        
+        for name, value in overrides.items():
+            if name in param_names:
+                param_updates[name] = float(value)
+            elif name in gains:
+                gains[name] = float(value)
+            elif name == 'pid_gains':
+                gains.update({k: float(v) for k, v in value.items() if k in gains})
+            elif name == 'initial_velocity':
+                initial_velocity = float(value)
+            elif name == 'dt':
+                dt = float(value)
+            else:
+                raise ValueError(f"Unknown simulation parameter: {name}")
+        
+        # replace() re-runs PhysicsParameters validation for the new values
+        params = replace(self.params, **param_updates)
+        controller = PIDController(
+            kp=gains['kp'], ki=gains['ki'], kd=gains['kd'],
+            integral_limit=self.controller.integral_limit,
+            output_limit=self.controller.output_limit
+        )
+        return Simulation(params, controller, initial_velocity=initial_velocity, dt=dt)
+    
+    def run_batch(self, configs: List[Dict], duration: float, target_angle=0.0) -> Dict[str, np.ndarray]:
+        """
+        Run independent trajectories from this simulation's configuration in parallel.
+        Each trajectory starts from the initial state; this simulation is not modified.
+        With numba the trajectories are spread over its thread pool (size it with
+        numba.set_num_threads or NUMBA_NUM_THREADS), otherwise they run sequentially.
+        
+        Args:
+            configs: One clone_with()-style overrides dict per trajectory ('dt' must not vary)
+            duration: Simulation duration (seconds)
+            target_angle: Target steering angle (degrees), shared or one per trajectory
         
-        for i in range(steps):
-            try:
-                result = self.step()
-                results.append(result)
-            except Exception as e:
-                warnings.warn(f"Error at step {i}: {str(e)}")
-                break
+        Returns:
+            History columns (HISTORY_FIELDS) as (len(configs), steps) arrays
+        """
+        if duration <= 0:
+            raise ValueError(f"Duration must be positive, got {duration}")
+        if any('dt' in overrides for overrides in configs):
+            raise ValueError("dt cannot be overridden within a batch")
+        
+        targets = np.broadcast_to(np.asarray(target_angle, dtype=np.float64), (len(configs),))
+        config = np.empty((len(configs), len(BATCH_CONFIG_FIELDS)), dtype=np.float64)
+        for k, overrides in enumerate(configs):
+            # clone_with validates and merges the overrides
+            clone = self.clone_with(overrides)
+            controller, params = clone.controller, clone.params
+            config[k] = (
+                clone.initial_velocity, targets[k],
+                controller.kp, controller.ki, controller.kd,
+                controller.integral_limit, controller.output_limit,
+                params.mass, params.max_lateral_acceleration(), params.max_friction_force(),
+                params.wheelbase, params.max_steering_angle
+            )
+        
+        steps = self._steps_for(duration)
+        out = np.empty((len(configs), len(HISTORY_FIELDS), steps), dtype=np.float64)
+        _simulate_batch_kernel(out, steps, config, float(self.dt), self.dynamics._epsilon)
+        return {name: out[:, i, :] for i, name in enumerate(HISTORY_FIELDS)}
+    
+    def apply_params_unchecked(self, velocity: Optional[float] = None, mass: Optional[float] = None,
+                               friction_coefficient: Optional[float] = None,
+                               gravity: Optional[float] = None,
+                               pid_gains: Optional[Tuple[float, float, float]] = None):
+        """
+        Apply parameter updates mid-simulation without re-validating them.
+        Callers (e.g. the API layer) must have validated the values already.
         
-        return results
+        Args:
+            velocity: New vehicle velocity (m/s)
+            mass: New vehicle mass (kg)
+            friction_coefficient: New friction coefficient
+            gravity: New gravitational acceleration (m/s²)
+            pid_gains: New (kp, ki, kd) controller gains
+        """
+        if velocity is not None:
+            self.state.velocity = velocity
+        if mass is not None:
+            self.params.mass = mass
+        if friction_coefficient is not None:
+            self.params.friction_coefficient = friction_coefficient
+        if gravity is not None:
+            self.params.gravity = gravity
+        if pid_gains is not None:
+            self.controller.set_gains(*pid_gains)
+        self.revision += 1
     
     def reset(self, initial_velocity: Optional[float] = None):
         """Reset simulation to initial state"""
@@ -498,7 +1205,7 @@ class Simulation:
         
         self.state = VehicleState(
             time=0.0,
-            position=np.array([0.0, 0.0], dtype=np.float64),
+            position=(0.0, 0.0),
             velocity=velocity,
             heading=0.0,
             steering_angle=0.0,
@@ -506,12 +1213,61 @@ class Simulation:
         )
         
         self.controller.reset()
-        self.history.clear()
+        self._n = 0
         self.current_time = 0.0
         self.target_angle = 0.0
+        self.revision += 1
+    
+    @property
+    def history(self) -> SimulationHistory:
+        """Recorded states, one per step (lazy view over the history buffer)"""
+        return SimulationHistory(self._buffer, self._n)
+    
+    def reserve(self, extra_steps: int):
+        """Grow the history buffer so that extra_steps more steps fit without reallocation"""
+        needed = self._n + extra_steps
+        capacity = self._buffer.shape[1]
+        if needed <= capacity:
+            return
+        buffer = np.empty((len(HISTORY_FIELDS), max(needed, 2 * capacity)), dtype=np.float64)
+        buffer[:, :self._n] = self._buffer[:, :self._n]
+        self._buffer = buffer
+    
+    def history_columns(self) -> Dict[str, np.ndarray]:
+        """History as contiguous per-field float64 arrays (structure-of-arrays)"""
+        n = self._n
+        return {name: self._buffer[i, :n].copy() for i, name in enumerate(HISTORY_FIELDS)}
+    
+    @property
+    def history_array(self) -> np.ndarray:
+        """History as a structured array with HISTORY_DTYPE, one record per step"""
+        array = np.empty(self._n, dtype=HISTORY_DTYPE)
+        for i, name in enumerate(HISTORY_FIELDS):
+            array[name] = self._buffer[i, :self._n]
+        return array
+    
+    def __getstate__(self) -> Dict:
+        # Drop unused buffer capacity so pickles only carry recorded history; the buffer
+        # and count come from the same state dict so they always agree
+        state = self.__dict__.copy()
+        state['_buffer'] = state['_buffer'][:, :state['_n']].copy()
+        return state
+    
+    def __setstate__(self, state: Dict):
+        history = state.pop('history', None)
+        state.setdefault('revision', 0)
+        self.__dict__.update(state)
+        if history is not None:
+            # Pickled before history moved to a column buffer
+            self._buffer = np.array(
+                [[s.time, s.position[0], s.position[1], s.velocity,
+                  s.heading, s.steering_angle, s.angular_velocity] for s in history],
+                dtype=np.float64
+            ).reshape(len(history), len(HISTORY_FIELDS)).T.copy()
+            self._n = len(history)
     
     def export_history(self, filename: str = 'simulation_data.json'):
-        """Export simulation history to JSON"""
+        """Export simulation history to JSON, one array per HISTORY_FIELDS column"""
         data = {
             'parameters': {
                 'mass': float(self.params.mass),
@@ -527,18 +1283,23 @@ class Simulation:
                     'kd': float(self.controller.kd)
                 }
             },
-            'history': [state.to_dict() for state in self.history],
+            'columns': self.history_columns(),
             'summary': self.get_summary_statistics()
         }
         
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=2)
+        if orjson is not None:
+            with open(filename, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2))
+        else:
+            data['columns'] = {name: column.tolist() for name, column in data['columns'].items()}
+            with open(filename, 'w') as f:
+                json.dump(data, f, indent=2)
         
         return filename
     
     def get_summary_statistics(self) -> Dict:
         """Calculate summary statistics from simulation history"""
-        if not self.history:
+        if not self._n:
             return {
                 'total_time': 0.0,
                 'total_steps': 0,
@@ -553,79 +1314,96 @@ class Simulation:
                 'steady_state_error': 0.0
             }
         
-        # Calculate path length (total distance traveled)
-        path_length = 0.0
-        for i in range(1, len(self.history)):
-            dx = self.history[i].position[0] - self.history[i-1].position[0]
-            dy = self.history[i].position[1] - self.history[i-1].position[1]
-            path_length += np.sqrt(dx**2 + dy**2)
+        columns = self.history_columns()
+        
+        # Calculate path length (total distance traveled) from per-step displacements
+        xs, ys = columns['position_x'], columns['position_y']
+        dx, dy = np.diff(xs), np.diff(ys)
+        path_length = np.sqrt(dx * dx + dy * dy).sum()
         
         # Steering errors
-        steering_angles = np.array([s.steering_angle for s in self.history])
-        errors = np.array([self.target_angle - s.steering_angle for s in self.history])
+        steering_angles = columns['steering_angle']
+        errors = self.target_angle - steering_angles
         abs_errors = np.abs(errors)
         
         # Calculate steady state error (average of last 10% of simulation)
         steady_state_idx = max(1, int(0.9 * len(errors)))
         steady_state_error = float(np.mean(abs_errors[steady_state_idx:]))
         
+        final_x = float(xs[-1])
+        final_y = float(ys[-1])
+        
         return {
-            'total_time': float(self.history[-1].time),
-            'total_steps': len(self.history),
-            'total_distance': float(np.linalg.norm(self.history[-1].position)),
+            'total_time': float(columns['time'][-1]),
+            'total_steps': self._n,
+            'total_distance': math.hypot(final_x, final_y),
             'path_length': float(path_length),
-            'final_position': [float(self.history[-1].position[0]), 
-                             float(self.history[-1].position[1])],
-            'final_heading_deg': float(np.degrees(self.history[-1].heading)),
-            'final_steering_angle': float(self.history[-1].steering_angle),
+            'final_position': [final_x, final_y],
+            'final_heading_deg': math.degrees(columns['heading_rad'][-1]),
+            'final_steering_angle': float(columns['steering_angle'][-1]),
             'mean_steering_error': float(np.mean(abs_errors)),
             'max_steering_error': float(np.max(abs_errors)),
-            'rms_steering_error': float(np.sqrt(np.mean(errors**2))),
-            'settling_time': self._calculate_settling_time(errors.tolist()),
-            'overshoot': float(self._calculate_overshoot(steering_angles.tolist())),
+            'rms_steering_error': math.sqrt(np.mean(errors**2)),
+            'settling_time': self._calculate_settling_time(errors, columns['time']),
+            'overshoot': float(self._calculate_overshoot(steering_angles)),
             'steady_state_error': steady_state_error
         }
     
-    def _calculate_settling_time(self, errors: List[float], threshold: float = 0.5) -> Optional[float]:
+    def _calculate_settling_time(self, errors: np.ndarray, times: np.ndarray,
+                                 threshold: float = 0.5) -> Optional[float]:
         """
         Calculate time to settle within threshold (2% or 5% criterion)
         
         Args:
-            errors: List of tracking errors
+            errors: Array of tracking errors
+            times: Array of sample times matching errors
             threshold: Settling threshold in degrees
         
         Returns:
             Settling time in seconds, or None if not settled
         """
-        if not errors:
+        if len(errors) == 0:
             return None
         
-        # Find first point where error stays within threshold
-        for i in range(len(errors)):
-            if all(abs(e) <= threshold for e in errors[i:]):
-                return float(self.history[i].time) if i < len(self.history) else None
+        # Settled from the sample after the last one outside the threshold
+        outside = np.flatnonzero(~(np.abs(errors) <= threshold))
+        idx = int(outside[-1]) + 1 if len(outside) else 0
+        if idx >= len(errors):
+            return None
         
-        return None
+        return float(times[idx])
     
-    def _calculate_overshoot(self, values: List[float]) -> float:
+    def _calculate_overshoot(self, values: np.ndarray) -> float:
         """
         Calculate maximum overshoot percentage
         
         Args:
-            values: List of steering angle values
+            values: Array of steering angle values
         
         Returns:
             Overshoot percentage
         """
-        if not values or abs(self.target_angle) < 1e-6:
+        if len(values) == 0 or abs(self.target_angle) < 1e-6:
             return 0.0
         
-        max_val = max(values) if self.target_angle > 0 else min(values)
+        max_val = np.max(values) if self.target_angle > 0 else np.min(values)
         overshoot = max(0.0, (abs(max_val) - abs(self.target_angle)) / abs(self.target_angle) * 100.0)
         
         return overshoot
 
 
+
+def run_sweep_value(template: Simulation, overrides: Dict, duration: float,
+                    target_angle: float) -> Dict:
+    """
+    Summary statistics for one parameter-sweep configuration: a clone of template with
+    overrides applied (see Simulation.clone_with), run for duration seconds.
+    Lives here rather than in the API so process-pool workers only import this module.
+    """
+    sim = template.clone_with(overrides)
+    sim.simulate(duration, target_angle)
+    return sim.get_summary_statistics()
+
 # Example usage and testing
 if __name__ == "__main__":
     print("=" * 70)
@@ -3,11 +3,12 @@ Unit tests for PhyVista physics engine (phyvista_backend.py)
 Run with: pytest Backend/tests/test_physics.py
 """
 
+import pickle
 import pytest
 import numpy as np
 from phyvista_backend import (
     PhysicsParameters, PIDController, VehicleDynamics,
-    VehicleState, Simulation, GravityEnvironment
+    VehicleState, Simulation, GravityEnvironment, turn_radius_vec
 )
 
 
@@ -84,6 +85,13 @@ class TestPhysicsParameters:
                                    wheelbase=2.5, max_steering_angle=45.0)
         assert params.max_friction_force() == 0.0
 
+    def test_derived_forces_follow_parameter_updates(self, earth_params):
+        earth_params.gravity = 1.62
+        assert earth_params.normal_force() == pytest.approx(500 * 1.62)
+        assert earth_params.max_lateral_acceleration() == pytest.approx(0.7 * 1.62)
+        restored = pickle.loads(pickle.dumps(earth_params))
+        assert restored.max_friction_force() == pytest.approx(0.7 * 500 * 1.62)
+
 
 # --- VEHICLE DYNAMICS TESTS ---
 
@@ -129,6 +137,22 @@ class TestVehicleDynamics:
         can_turn, _ = dynamics.check_slip_condition(10.0, 15.0)
         assert can_turn is False
 
+    def test_turn_radius_vec_matches_scalar(self, earth_params):
+        dynamics = VehicleDynamics(earth_params)
+        angles = np.array([0.0, 10.0, -30.0, 45.0])
+        radii = turn_radius_vec(angles, earth_params.wheelbase)
+        assert radii[0] == np.inf
+        for angle, radius in zip(angles[1:], radii[1:]):
+            assert radius == pytest.approx(dynamics.calculate_turn_radius(angle))
+
+    def test_max_safe_velocity_batch_matches_scalar(self, moon_params):
+        dynamics = VehicleDynamics(moon_params)
+        angles = np.array([0.0, 5.0, -20.0, 45.0])
+        velocities = dynamics.calculate_max_safe_velocity_batch(angles)
+        assert velocities[0] == np.inf
+        for angle, velocity in zip(angles[1:], velocities[1:]):
+            assert velocity == pytest.approx(dynamics.calculate_max_safe_velocity(angle))
+
     def test_state_update_advances_time(self, earth_params, default_state):
         dynamics = VehicleDynamics(earth_params)
         new_state = dynamics.update_state(default_state, dt=0.1, steering_input=0.0)
@@ -141,6 +165,22 @@ class TestVehicleDynamics:
         assert new_state.position[0] > 0.0
         assert new_state.position[1] == pytest.approx(0.0, abs=1e-6)
 
+    def test_integrate_with_diagnostics_matches_scalar(self, earth_params, default_state):
+        dynamics = VehicleDynamics(earth_params)
+        row, diag = dynamics.integrate_with_diagnostics(
+            default_state.time, default_state.pos_x, default_state.pos_y, default_state.velocity,
+            default_state.heading, default_state.steering_angle, 0.1, 100.0
+        )
+        velocity, steering_angle = row[3], row[5]
+        turn_radius, centripetal_force, can_turn, utilization, max_safe_velocity = diag
+        assert steering_angle == pytest.approx(10.0)
+        assert turn_radius == pytest.approx(dynamics.calculate_turn_radius(10.0))
+        assert centripetal_force == pytest.approx(
+            dynamics.calculate_centripetal_force(velocity, turn_radius))
+        assert (can_turn, utilization) == pytest.approx(
+            dynamics.check_slip_condition(velocity, 10.0))
+        assert max_safe_velocity == pytest.approx(dynamics.calculate_max_safe_velocity(10.0))
+
 
 # --- PID CONTROLLER TESTS ---
 
@@ -170,6 +210,17 @@ class TestPIDController:
         pid.reset()
         assert pid.integral == 0.0
 
+    def test_first_call_path_swaps_and_resets(self, pid):
+        pid.compute(target=15.0, current=0.0, time=0.5)
+        assert pid.integral == pytest.approx(15.0 * 0.01)
+        pid.compute(target=15.0, current=0.0, time=0.7)
+        assert pid.integral == pytest.approx(15.0 * 0.01 + 15.0 * 0.2)
+        assert not pickle.loads(pickle.dumps(pid)).first_call
+        pid.reset()
+        restored = pickle.loads(pickle.dumps(pid))
+        restored.compute(target=15.0, current=0.0, time=3.0)
+        assert restored.integral == pytest.approx(15.0 * 0.01)
+
     def test_set_gains(self, pid):
         pid.set_gains(1.0, 0.5, 0.3)
         assert pid.kp == 1.0
@@ -203,6 +254,136 @@ class TestSimulation:
         results = sim.run(duration=1.0, target_angle=15.0)
         assert len(results) == 10
 
+    def test_run_sampled_matches_full_run(self, moon_params):
+        full = Simulation(moon_params, PIDController(), initial_velocity=20.0)
+        sampled = Simulation(moon_params, PIDController(), initial_velocity=20.0)
+        results = full.run(duration=1.0, target_angle=30.0)
+        samples, total_steps = sampled.run_sampled(duration=1.0, target_angle=30.0, max_points=5)
+        assert total_steps == len(results) == 100
+        assert [s['state']['time'] for s in samples] == pytest.approx(
+            [results[i]['state']['time'] for i in (0, 24, 49, 74, 99)])
+        assert samples[-1] == results[-1]
+        with pytest.raises(ValueError):
+            sampled.run_sampled(duration=1.0, target_angle=30.0, max_points=1)
+
+    def test_run_iter_yields_each_step(self, earth_params, pid):
+        sim = Simulation(earth_params, pid, initial_velocity=10.0, dt=0.1)
+        results = list(sim.run_iter(duration=1.0, target_angle=15.0))
+        assert len(results) == 10
+        assert len(sim.history) == 10
+        assert results[-1]['state']['time'] == pytest.approx(1.0)
+
+    def test_run_iter_validates_before_iterating(self, earth_params, pid):
+        sim = Simulation(earth_params, pid, initial_velocity=10.0)
+        with pytest.raises(ValueError):
+            sim.run_iter(duration=0.0, target_angle=15.0)
+
+    def test_simulate_matches_stepping(self, moon_params):
+        fused = Simulation(moon_params, PIDController(), initial_velocity=20.0, dt=0.01)
+        stepped = Simulation(moon_params, PIDController(), initial_velocity=20.0, dt=0.01)
+        columns = fused.simulate(duration=1.0, target_angle=30.0)
+        results = list(stepped.run_iter(duration=1.0, target_angle=30.0))
+        assert len(columns['time']) == len(results) == 100
+        assert columns['heading_rad'][-1] == pytest.approx(results[-1]['state']['heading_rad'])
+        assert fused.controller.integral == pytest.approx(stepped.controller.integral)
+        assert fused.step()['state'] == pytest.approx(stepped.step()['state'])
+
+    def test_step_count_does_not_overshoot(self, moon_params, pid):
+        # 0.07 / 0.01 == 7.000000000000001, which math.ceil alone rounds up to 8
+        sim = Simulation(moon_params, pid, initial_velocity=20.0, dt=0.01)
+        assert sim._steps_for(0.07) == 7
+        columns = sim.simulate(duration=0.07, target_angle=10.0)
+        assert len(columns['time']) == 7
+        assert columns['time'][-1] == pytest.approx(0.07)
+
+    def test_run_batch_matches_single_runs(self, moon_params, pid):
+        sim = Simulation(moon_params, pid, initial_velocity=20.0)
+        configs = [{'mass': 300.0}, {'friction_coefficient': 0.3, 'kp': 1.0}]
+        batch = sim.run_batch(configs, duration=0.5, target_angle=[20.0, -10.0])
+        assert batch['time'].shape == (2, 50)
+        single = sim.clone_with(configs[1]).simulate(duration=0.5, target_angle=-10.0)
+        assert np.allclose(batch['position_y'][1], single['position_y'])
+        assert len(sim.history) == 0
+        with pytest.raises(ValueError):
+            sim.run_batch([{'dt': 0.1}], duration=0.5)
+
+    def test_compute_diagnostics_matches_step(self, moon_params, pid):
+        sim = Simulation(moon_params, pid, initial_velocity=20.0)
+        sim.target_angle = 30.0
+        for _ in range(20):
+            sim.advance()
+        result = sim.step()
+        diagnostics = sim.compute_diagnostics()
+        assert len(diagnostics['can_turn']) == 21
+        assert bool(diagnostics['can_turn'][-1]) == result['diagnostics']['can_turn']
+        assert diagnostics['friction_utilization'][-1] == pytest.approx(
+            result['diagnostics']['friction_utilization'])
+        assert diagnostics['turn_radius'][-1] == pytest.approx(result['diagnostics']['turn_radius'])
+
+    def test_settling_time_after_last_excursion(self, earth_params, pid):
+        sim = Simulation(earth_params, pid)
+        times = np.array([0.1, 0.2, 0.3, 0.4, 0.5])
+        assert sim._calculate_settling_time(np.array([2.0, 0.1, 1.0, 0.2, 0.1]), times) == pytest.approx(0.4)
+        assert sim._calculate_settling_time(np.array([0.1, 0.2, 0.1, 0.0, 0.1]), times) == pytest.approx(0.1)
+        assert sim._calculate_settling_time(np.array([0.1, 0.2, 0.1, 0.0, 3.0]), times) is None
+
+    def test_history_array_matches_history(self, earth_params, pid):
+        sim = Simulation(earth_params, pid, initial_velocity=10.0, dt=0.1)
+        sim.run(duration=1.0, target_angle=15.0)
+        array = sim.history_array
+        assert array.shape == (10,)
+        assert array['time'][-1] == pytest.approx(sim.history[-1].time)
+        assert array['position_x'][-1] == pytest.approx(sim.history[-1].position[0])
+        assert sim.history_columns()['steering_angle'][-1] == pytest.approx(sim.state.steering_angle)
+
+    def test_history_buffer_grows_and_pickles(self, earth_params, pid):
+        sim = Simulation(earth_params, pid, initial_velocity=10.0, dt=0.01)
+        steps = Simulation.INITIAL_CAPACITY + 10
+        for _ in range(steps):
+            sim.step()
+        restored = pickle.loads(pickle.dumps(sim))
+        assert len(restored.history) == steps
+        assert restored.history[-1].time == pytest.approx(sim.state.time)
+        assert restored.history[0].position[0] == pytest.approx(sim.history[0].position[0])
+        restored.step()
+        assert len(restored.history) == steps + 1
+
+    def test_apply_params_unchecked(self, earth_params, pid):
+        sim = Simulation(earth_params, pid, initial_velocity=10.0)
+        sim.apply_params_unchecked(velocity=5.0, mass=800.0, pid_gains=(1.0, 0.2, 0.3))
+        assert sim.state.velocity == 5.0
+        assert sim.params.mass == 800.0
+        assert sim.params.gravity == 9.81
+        assert (sim.controller.kp, sim.controller.ki, sim.controller.kd) == (1.0, 0.2, 0.3)
+
+    def test_revision_tracks_changes(self, earth_params, pid):
+        sim = Simulation(earth_params, pid, initial_velocity=10.0)
+        sim.step()
+        after_step = sim.revision
+        sim.reset()
+        sim.step()
+        assert after_step > 0
+        assert sim.revision > after_step
+
+    def test_clone_with_overrides_configuration(self, earth_params, pid):
+        sim = Simulation(earth_params, pid, initial_velocity=10.0, dt=0.05)
+        sim.run(duration=1.0, target_angle=15.0)
+        clone = sim.clone_with({'mass': 800.0, 'kp': 1.2})
+        assert clone.params.mass == 800.0
+        assert clone.params.gravity == earth_params.gravity
+        assert earth_params.mass == 500.0
+        assert clone.controller.kp == 1.2
+        assert clone.controller.ki == pid.ki
+        assert clone.dt == 0.05
+        assert len(clone.history) == 0
+
+    def test_clone_with_rejects_unknown_and_invalid(self, earth_params, pid):
+        sim = Simulation(earth_params, pid)
+        with pytest.raises(ValueError):
+            sim.clone_with({'bogus': 1.0})
+        with pytest.raises(ValueError):
+            sim.clone_with({'mass': -1.0})
+
     def test_reset_clears_history(self, earth_params, pid):
         sim = Simulation(earth_params, pid, initial_velocity=10.0)
         sim.run(duration=1.0, target_angle=15.0)